@@ -0,0 +1,318 @@
+from contextlib import asynccontextmanager
+from io import BytesIO
+import base64
+import binascii
+import json
+import os
+import shutil
+import tempfile
+import uuid
+import zipfile
+
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Header, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from cache import obter_cache
+from core import (
+    ErroDiscovery,
+    extrair_discoveries,
+    gerar_insights_async,
+    gerar_insights_secoes_async,
+    gerar_insights_stream_async,
+    idiomas_suportados,
+    normalizar_idioma,
+)
+from ingestao import MAX_ARQUIVOS_DISCOVERY, encerrar_pool
+from jobs import JOBS_DB, ArmazemJobs, FilaJobs
+from metricas import Instrumentacao, encerrar_processo, exportar, medir
+from relatorios import diff_secoes, obter_armazem
+from secoes import ErroSecao, validar_secoes
+from sobrecarga import ControleCarga
+from uploads import (
+    MAX_MB_DISCOVERY,
+    ArquivoGrande,
+    LimiteCorpo,
+    em_bytes,
+    ler_transcricao,
+    verificar_tamanho,
+)
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    # Workers da fila de jobs vivem junto com o processo da API
+    fila = FilaJobs(ArmazemJobs(JOBS_DB))
+    fila.iniciar()
+    app.state.fila_jobs = fila
+    yield
+    await fila.parar()
+    encerrar_pool()
+    encerrar_processo()
+
+app = FastAPI(lifespan=ciclo_de_vida)
+
+# Corpo acima de MAX_MB_REQUISICAO volta 413, com ou sem Content-Length
+app.add_middleware(LimiteCorpo)
+
+# Log JSON por requisição, fechado só depois do último byte da resposta
+app.add_middleware(Instrumentacao)
+
+# Por fora de tudo: teto de requisições em voo (503), prazo por requisição (504) e /healthz
+app.add_middleware(ControleCarga)
+
+@app.get("/metrics")
+async def metrics():
+    conteudo, tipo = exportar()
+    return Response(content=conteudo, media_type=tipo)
+
+# 🔐 Pega a chave secreta da variável de ambiente
+EXPECTED_API_KEY = os.getenv("API_KEY_SECRETA")
+
+def _extrair_discovery(arquivos, prefixo_versao=None):
+    # arquivos: [(nome, file-like)] -> (texto, relatórios de abas alteradas por arquivo)
+    try:
+        if len(arquivos) == 1:
+            return extrair_discoveries(arquivos, prefixo_versao)
+        # O pool de processos lê de caminhos: copia o spool de cada upload para disco
+        with tempfile.TemporaryDirectory() as pasta:
+            caminhos = []
+            for i, (nome, arquivo) in enumerate(arquivos):
+                caminho = os.path.join(pasta, f"{i}.xlsx")
+                with open(caminho, "wb") as destino:
+                    shutil.copyfileobj(arquivo, destino)
+                caminhos.append((nome, caminho))
+            return extrair_discoveries(caminhos, prefixo_versao)
+    except ErroDiscovery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def verificar_chave(x_api_key):
+    if x_api_key != EXPECTED_API_KEY:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+def validar_idioma(idioma):
+    idioma_normalizado = idiomas_suportados.get(normalizar_idioma(idioma))
+    if not idioma_normalizado:
+        raise HTTPException(status_code=400, detail="Idioma inválido. Use: portugues, espanol ou english.")
+    return idioma_normalizado
+
+async def preparar_entrada(nome_cliente, idioma, texto_transcricao, arquivo_discovery, arquivo_transcricao, x_api_key):
+    verificar_chave(x_api_key)
+    idioma = validar_idioma(idioma)
+
+    discovery_texto, abas = "", None
+    if arquivo_discovery:
+        # Um ou mais workbooks (campo arquivo_discovery repetido)
+        if len(arquivo_discovery) > MAX_ARQUIVOS_DISCOVERY:
+            raise HTTPException(status_code=400, detail=f"Envie no máximo {MAX_ARQUIVOS_DISCOVERY} arquivos de discovery.")
+        try:
+            for arquivo in arquivo_discovery:
+                verificar_tamanho(arquivo, "arquivo_discovery", MAX_MB_DISCOVERY)
+        except ArquivoGrande as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        # Parsing do Excel é CPU-bound: roda fora do event loop, direto do arquivo
+        # temporário do upload; só abas alteradas são reprocessadas
+        arquivos = [(a.filename or f"discovery_{i}.xlsx", a.file) for i, a in enumerate(arquivo_discovery)]
+        discovery_texto, abas = await run_in_threadpool(_extrair_discovery, arquivos, nome_cliente)
+
+    if not discovery_texto and not texto_transcricao and not arquivo_transcricao:
+        raise HTTPException(status_code=400, detail="É necessário fornecer discovery e/ou transcrição.")
+
+    if arquivo_transcricao:
+        try:
+            with medir("leitura_upload"):
+                texto_transcricao = await ler_transcricao(arquivo_transcricao)
+        except ArquivoGrande as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+    return discovery_texto, texto_transcricao, idioma, abas
+
+@app.post("/extract-insights")
+async def extract_insights_api(
+    nome_cliente: str = Form(...),
+    idioma: str = Form(...),
+    observacoes: str = Form(""),
+    texto_transcricao: str = Form(""),
+    arquivo_discovery: list[UploadFile] = File(None),
+    arquivo_transcricao: UploadFile = None,
+    x_api_key: str = Header(None)
+):
+    discovery_texto, texto_transcricao, idioma, abas = await preparar_entrada(
+        nome_cliente, idioma, texto_transcricao, arquivo_discovery, arquivo_transcricao, x_api_key
+    )
+    insights = await gerar_insights_async(discovery_texto, texto_transcricao, observacoes, nome_cliente, idioma)
+    return {"insights": insights, "discovery_abas": abas}
+
+@app.post("/extract-insights/stream")
+async def extract_insights_stream_api(
+    nome_cliente: str = Form(...),
+    idioma: str = Form(...),
+    observacoes: str = Form(""),
+    texto_transcricao: str = Form(""),
+    arquivo_discovery: list[UploadFile] = File(None),
+    arquivo_transcricao: UploadFile = None,
+    x_api_key: str = Header(None)
+):
+    # Mesmo contrato do /extract-insights, mas responde em SSE:
+    # "data: {"delta": ...}" a cada trecho e "event: done" ao final
+    discovery_texto, texto_transcricao, idioma, _ = await preparar_entrada(
+        nome_cliente, idioma, texto_transcricao, arquivo_discovery, arquivo_transcricao, x_api_key
+    )
+    trechos = gerar_insights_stream_async(discovery_texto, texto_transcricao, observacoes, nome_cliente, idioma)
+    return StreamingResponse(
+        eventos_sse(trechos),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/extract-insights/sections")
+async def extract_insights_sections_api(
+    nome_cliente: str = Form(...),
+    idioma: str = Form(...),
+    observacoes: str = Form(""),
+    texto_transcricao: str = Form(""),
+    secoes: str = Form(""),
+    regenerar: bool = Form(False),
+    arquivo_discovery: list[UploadFile] = File(None),
+    arquivo_transcricao: UploadFile = None,
+    x_api_key: str = Header(None)
+):
+    # Seções geradas em paralelo com saída JSON. secoes="riscos,integracoes" gera só
+    # essas (as demais não são cobradas); regenerar=true ignora o cache delas.
+    try:
+        chaves = validar_secoes([s.strip() for s in secoes.split(",") if s.strip()])
+    except ErroSecao as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    discovery_texto, texto_transcricao, idioma, abas = await preparar_entrada(
+        nome_cliente, idioma, texto_transcricao, arquivo_discovery, arquivo_transcricao, x_api_key
+    )
+    resultado = await gerar_insights_secoes_async(
+        discovery_texto, texto_transcricao, observacoes, nome_cliente, idioma, chaves, regenerar
+    )
+    return {**resultado, "discovery_abas": abas}
+
+async def eventos_sse(trechos):
+    try:
+        async for trecho in trechos:
+            yield f"data: {json.dumps({'delta': trecho}, ensure_ascii=False)}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)}, ensure_ascii=False)}\n\n"
+        return
+    yield "event: done\ndata: {}\n\n"
+
+@app.get("/cache/stats")
+async def cache_stats(x_api_key: str = Header(None)):
+    verificar_chave(x_api_key)
+    return obter_cache().estatisticas()
+
+# 📦 Jobs: respondem na hora com o id; o resultado sai em GET /jobs/{id}
+@app.post("/jobs", status_code=202)
+async def criar_job(
+    request: Request,
+    nome_cliente: str = Form(...),
+    idioma: str = Form(...),
+    observacoes: str = Form(""),
+    texto_transcricao: str = Form(""),
+    arquivo_discovery: list[UploadFile] = File(None),
+    arquivo_transcricao: UploadFile = None,
+    x_api_key: str = Header(None)
+):
+    discovery_texto, texto_transcricao, idioma, _ = await preparar_entrada(
+        nome_cliente, idioma, texto_transcricao, arquivo_discovery, arquivo_transcricao, x_api_key
+    )
+    (id_,) = await request.app.state.fila_jobs.submeter([{
+        "cliente": nome_cliente, "idioma": idioma, "discovery": discovery_texto,
+        "transcricao": texto_transcricao, "observacoes": observacoes,
+    }])
+    return {"id": id_, "estado": "pendente"}
+
+class ItemLote(BaseModel):
+    nome_cliente: str
+    idioma: str
+    observacoes: str = ""
+    texto_transcricao: str = ""
+    discovery_base64: str = ""  # .xlsx em base64 (opcional)
+
+class Lote(BaseModel):
+    itens: list[ItemLote]
+
+@app.post("/jobs/batch", status_code=202)
+async def criar_lote(request: Request, lote: Lote, x_api_key: str = Header(None)):
+    verificar_chave(x_api_key)
+    if not lote.itens:
+        raise HTTPException(status_code=400, detail="O lote não tem itens.")
+    entradas = []
+    for posicao, item in enumerate(lote.itens):
+        idioma = validar_idioma(item.idioma)
+        conteudo = None
+        if item.discovery_base64:
+            if len(item.discovery_base64) * 3 // 4 > em_bytes(MAX_MB_DISCOVERY):
+                raise HTTPException(status_code=413, detail=f"Item {posicao}: {ArquivoGrande('discovery_base64', MAX_MB_DISCOVERY)}")
+            try:
+                conteudo = base64.b64decode(item.discovery_base64, validate=True)
+            except binascii.Error:
+                raise HTTPException(status_code=400, detail=f"Item {posicao}: discovery_base64 inválido.")
+            if not zipfile.is_zipfile(BytesIO(conteudo)):
+                raise HTTPException(status_code=400, detail=f"Item {posicao}: discovery_base64 não é um .xlsx.")
+        if not conteudo and not item.texto_transcricao:
+            raise HTTPException(status_code=400, detail=f"Item {posicao}: é necessário fornecer discovery e/ou transcrição.")
+        # O workbook vai cru para a fila: o parsing acontece no worker do job
+        entradas.append({
+            "cliente": item.nome_cliente, "idioma": idioma, "discovery": "", "discovery_xlsx": conteudo,
+            "transcricao": item.texto_transcricao, "observacoes": item.observacoes,
+        })
+    id_lote = uuid.uuid4().hex
+    ids = await request.app.state.fila_jobs.submeter(entradas, lote=id_lote)
+    return {"lote": id_lote, "jobs": [{"id": id_, "estado": "pendente"} for id_ in ids]}
+
+@app.get("/jobs/batch/{id_lote}")
+async def consultar_lote(request: Request, id_lote: str, x_api_key: str = Header(None)):
+    verificar_chave(x_api_key)
+    jobs = await run_in_threadpool(request.app.state.fila_jobs.armazem.resumo_lote, id_lote)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Lote não encontrado.")
+    return {"lote": id_lote, "jobs": jobs}
+
+@app.get("/jobs/{id_job}")
+async def consultar_job(request: Request, id_job: str, x_api_key: str = Header(None)):
+    verificar_chave(x_api_key)
+    job = await run_in_threadpool(request.app.state.fila_jobs.armazem.obter, id_job)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return job
+
+# 🗂️ Histórico: relatórios já gerados, consultados sem nova chamada ao modelo
+def _historico():
+    armazem = obter_armazem()
+    if armazem is None:
+        raise HTTPException(status_code=404, detail="Histórico de relatórios desligado (RELATORIOS_DB).")
+    return armazem
+
+def _relatorio(armazem, id_relatorio):
+    relatorio = armazem.obter(id_relatorio)
+    if relatorio is None:
+        raise HTTPException(status_code=404, detail=f"Relatório {id_relatorio} não encontrado.")
+    return relatorio
+
+@app.get("/reports")
+async def listar_relatorios(cliente: str = None, limite: int = 50, deslocamento: int = 0, x_api_key: str = Header(None)):
+    verificar_chave(x_api_key)
+    limite = max(1, min(limite, 200))
+    return {"relatorios": _historico().listar(cliente, limite, max(0, deslocamento))}
+
+@app.get("/reports/search")
+async def buscar_relatorios(q: str, cliente: str = None, limite: int = 20, x_api_key: str = Header(None)):
+    verificar_chave(x_api_key)
+    return {"resultados": _historico().buscar(q, cliente, max(1, min(limite, 100)))}
+
+@app.get("/reports/{id_relatorio}")
+async def consultar_relatorio(id_relatorio: str, x_api_key: str = Header(None)):
+    verificar_chave(x_api_key)
+    return _relatorio(_historico(), id_relatorio)
+
+@app.get("/reports/{id_relatorio}/diff/{id_outro}")
+async def comparar_relatorios(id_relatorio: str, id_outro: str, x_api_key: str = Header(None)):
+    # Seções iguais, alteradas (com unified diff), novas e removidas entre duas execuções
+    verificar_chave(x_api_key)
+    armazem = _historico()
+    return diff_secoes(_relatorio(armazem, id_relatorio), _relatorio(armazem, id_outro))
@@ -0,0 +1,13 @@
+import sqlite3
+
+# Conexão SQLite para os arquivos compartilhados entre os workers (cache,
+# jobs, histórico). WAL deixa leituras correrem junto com a escrita, e
+# busy_timeout espera o lock de outro processo em vez de falhar na hora.
+BUSY_TIMEOUT_MS = 5000
+
+
+def conectar_sqlite(caminho):
+    db = sqlite3.connect(caminho, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    return db
@@ -0,0 +1,284 @@
+# Benchmark offline de parsing e teste de carga do /extract-insights.
+#
+#   python benchmarks/bench_carga.py --concorrencia 1 8 32 --requisicoes 64
+#
+# 1) Mede extrair_discovery_texto em workbooks sintéticos de tamanho crescente.
+# 2) Sobe o servidor fake da OpenAI (benchmarks/servidor_fake.py) e a API
+#    (uvicorn main:app) apontando para ele, dispara N clientes concorrentes
+#    com discovery + transcrição sintéticos e reporta p50/p95, vazão e o pico
+#    de RSS do processo da API, para cada combinação de --linhas (tamanho do
+#    workbook) e --falas (tamanho da transcrição). Nada sai da máquina.
+#
+#   python benchmarks/bench_carga.py --sem-parsing --linhas 100 2000 --falas 100 2000
+# 3) Perfil de produção (--workers, --limite-em-voo, --prazo): com mais
+#    clientes que o teto, o excedente deve voltar 503 em milissegundos (com
+#    Retry-After) e nada deve passar do prazo, em vez de acumular timeouts.
+#
+#   python benchmarks/bench_carga.py --sem-parsing --workers 2 --limite-em-voo 8 --concorrencia 8 32 64
+#
+# 4) --limites: limitador de vazão e backoff ligados (--rpm/--tpm) contra o fake
+#    devolvendo 429 (--taxa-429); reporta retentativas, 429 finais e o RPM
+#    obtido, e falha se o fake recebeu mais chamadas que a cota permite.
+#
+#   python benchmarks/bench_carga.py --limites --rpm 60 --taxa-429 0.2 --requisicoes-limites 90
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from benchmarks.dados import gerar_transcricao, gerar_workbook  # noqa: E402
+from core import extrair_discovery_texto  # noqa: E402
+from io import BytesIO  # noqa: E402
+
+CHAVE_API = "bench"
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[indice]
+
+
+def rss_pico_mb(pid):
+    # Linux: VmHWM = pico de memória residente do processo, somado ao dos
+    # filhos diretos (com --workers, o processo principal só supervisiona)
+    total = 0.0
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            filhos = [int(filho) for filho in f.read().split()]
+        for processo in [pid, *filhos]:
+            with open(f"/proc/{processo}/status") as f:
+                for linha in f:
+                    if linha.startswith("VmHWM:"):
+                        total += int(linha.split()[1]) / 1024
+    except OSError:
+        return float("nan")
+    return total
+
+
+def bench_parsing(tamanhos, repeticoes):
+    # "frio": workbook nunca visto (semente diferente a cada repetição);
+    # "cache": o mesmo workbook de novo, servido pelo cache por aba
+    print("\n== Parsing do discovery (extrair_discovery_texto) ==")
+    print(f"{'abas x linhas':>14} {'xlsx (KB)':>10} {'p50 frio (ms)':>14} {'p95 frio (ms)':>14} {'p50 cache (ms)':>15}")
+    for abas, linhas in tamanhos:
+        frio, quente = [], []
+        for semente in range(repeticoes):
+            dados = gerar_workbook(abas, linhas, semente)
+            inicio = time.perf_counter()
+            extrair_discovery_texto(BytesIO(dados))
+            frio.append((time.perf_counter() - inicio) * 1000)
+            inicio = time.perf_counter()
+            extrair_discovery_texto(BytesIO(dados))
+            quente.append((time.perf_counter() - inicio) * 1000)
+        print(f"{f'{abas}x{linhas}':>14} {len(dados) // 1024:>10} {percentil(frio, 50):>14.0f} "
+              f"{percentil(frio, 95):>14.0f} {percentil(quente, 50):>15.0f}")
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def aguardar(url, processo, timeout=30):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if processo.poll() is not None:
+            sys.exit(f"Processo terminou antes de responder em {url}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    sys.exit(f"Timeout esperando {url}")
+
+
+def subir_servidores(args, pasta, rpm=0, tpm=0, taxa_429=0.0, workers=None):
+    # rpm/tpm = 0: sem limite local de vazão
+    porta_fake, porta_api = porta_livre(), porta_livre()
+    fake = subprocess.Popen([
+        sys.executable, os.path.join(RAIZ, "benchmarks", "servidor_fake.py"), "--porta", str(porta_fake),
+        "--latencia", str(args.latencia), "--tokens-por-segundo", str(args.tokens_por_segundo),
+        "--tokens-resposta", str(args.tokens_resposta), "--taxa-429", str(taxa_429),
+    ])
+    ambiente = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{porta_fake}/v1",
+        "OPENAI_API_KEY": "fake",
+        "API_KEY_SECRETA": CHAVE_API,
+        "INSIGHTS_CACHE_ITENS": "0",  # sem cache: cada requisição vai ao "modelo"
+        "INSIGHTS_CACHE_DB": "",
+        "JOBS_DB": os.path.join(pasta, "jobs.db"),
+        "OPENAI_RPM": str(rpm),
+        "OPENAI_TPM": str(tpm),
+        "OPENAI_BACKOFF_BASE": str(args.backoff_base),
+        "MAX_GERACOES_CONCORRENTES": str(max(args.concorrencia)),
+        "MAX_REQUISICOES_EM_VOO": str(args.limite_em_voo),
+        "PRAZO_REQUISICAO": str(args.prazo),
+        "RETRY_AFTER_SEGUNDOS": str(args.retry_after),
+        "RELATORIOS_DB": "",
+    }
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(porta_api), "--log-level", "warning",
+         "--workers", str(workers or args.workers)],
+        cwd=RAIZ, env=ambiente, stderr=subprocess.DEVNULL,
+    )
+    aguardar(f"http://127.0.0.1:{porta_fake}/estatisticas", fake)
+    aguardar(f"http://127.0.0.1:{porta_api}/healthz", api)
+    return fake, api, f"http://127.0.0.1:{porta_api}", f"http://127.0.0.1:{porta_fake}"
+
+
+async def rodada(url, concorrencia, requisicoes, workbook, transcricao, tentativas=1):
+    # Com 503, o cliente espera o Retry-After e tenta de novo (até `tentativas` vezes)
+    limite = asyncio.Semaphore(concorrencia)
+    latencias, rejeitadas, erros = [], [], {}
+
+    async def uma(cliente, i):
+        async with limite:
+            inicio = time.perf_counter()
+            for tentativa in range(tentativas):
+                envio = time.perf_counter()
+                r = await cliente.post(
+                    f"{url}/extract-insights",
+                    data={"nome_cliente": f"Cliente {concorrencia}-{i}", "idioma": "portugues",
+                          "texto_transcricao": transcricao},
+                    files={"arquivo_discovery": ("discovery.xlsx", workbook)},
+                    headers={"x-api-key": CHAVE_API},
+                )
+                if r.status_code != 503:
+                    break
+                rejeitadas.append(time.perf_counter() - envio)
+                if tentativa < tentativas - 1:
+                    await asyncio.sleep(float(r.headers.get("retry-after", "1")))
+            if r.status_code == 200:
+                latencias.append(time.perf_counter() - inicio)
+            else:
+                erros[r.status_code] = erros.get(r.status_code, 0) + 1
+
+    async with httpx.AsyncClient(timeout=600, limits=httpx.Limits(max_connections=concorrencia)) as cliente:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(uma(cliente, i) for i in range(requisicoes)))
+        duracao = time.perf_counter() - inicio
+    return latencias, rejeitadas, erros, duracao
+
+
+def bench_carga(args):
+    print("\n== Carga no /extract-insights (OpenAI fake: "
+          f"{args.latencia}s + {args.tokens_resposta} tokens a {args.tokens_por_segundo:.0f} tok/s) ==")
+    entradas = [
+        (linhas, falas, gerar_workbook(args.abas, linhas), gerar_transcricao(falas))
+        for linhas in args.linhas for falas in args.falas
+    ]
+    with tempfile.TemporaryDirectory() as pasta:
+        fake, api, url, _ = subir_servidores(args, pasta)
+        try:
+            print(f"workers={args.workers} limite em voo={args.limite_em_voo or '-'}/worker prazo={args.prazo or '-'}s "
+                  f"abas={args.abas}")
+            print(f"{'linhas':>7} {'falas':>6} {'clientes':>9} {'reqs':>5} {'200':>5} {'503 (resp)':>10} {'falhas':>10} "
+                  f"{'p50 (s)':>8} {'p95 (s)':>8} {'p95 503 (ms)':>13} {'ok/s':>7} {'RSS pico (MB)':>14}")
+            for linhas, falas, workbook, transcricao in entradas:
+                for concorrencia in args.concorrencia:
+                    latencias, rejeitadas, erros, duracao = asyncio.run(
+                        rodada(url, concorrencia, args.requisicoes, workbook, transcricao, args.tentativas)
+                    )
+                    falhas = ",".join(f"{status}:{n}" for status, n in sorted(erros.items())) or "0"
+                    p95_rejeitadas = percentil(rejeitadas, 95) * 1000 if rejeitadas else float("nan")
+                    print(f"{linhas:>7} {falas:>6} {concorrencia:>9} {args.requisicoes:>5} {len(latencias):>5} "
+                          f"{len(rejeitadas):>10} {falhas:>10} "
+                          f"{percentil(latencias, 50) if latencias else float('nan'):>8.2f} "
+                          f"{percentil(latencias, 95) if latencias else float('nan'):>8.2f} {p95_rejeitadas:>13.1f} "
+                          f"{len(latencias) / duracao:>7.2f} {rss_pico_mb(api.pid):>14.1f}")
+        finally:
+            for processo in (api, fake):
+                processo.terminate()
+                processo.wait()
+
+
+def contador_prometheus(url, nome):
+    for linha in httpx.get(f"{url}/metrics").text.splitlines():
+        if linha.startswith(nome + " "):
+            return float(linha.split()[1])
+    return 0.0
+
+
+def bench_limites(args):
+    # Limitador (OPENAI_RPM/TPM) e backoff contra o servidor fake devolvendo 429.
+    # Um worker só: o contador de retentativas do /metrics é por processo
+    print(f"\n== Limitador e backoff (cota {args.rpm:g} RPM / {args.tpm:g} TPM, "
+          f"{args.taxa_429:.0%} de 429 no fake, {args.requisicoes_limites} requisições) ==")
+    workbook = gerar_workbook(args.abas, args.linhas[0])
+    transcricao = gerar_transcricao(args.falas[0])
+    with tempfile.TemporaryDirectory() as pasta:
+        fake, api, url, url_fake = subir_servidores(args, pasta, args.rpm, args.tpm, args.taxa_429, workers=1)
+        try:
+            latencias, _, erros, duracao = asyncio.run(
+                rodada(url, max(args.concorrencia), args.requisicoes_limites, workbook, transcricao)
+            )
+            chamadas = httpx.get(f"{url_fake}/estatisticas").json()
+            retentativas = contador_prometheus(url, "insights_openai_retentativas_total")
+        finally:
+            for processo in (api, fake):
+                processo.terminate()
+                processo.wait()
+    # O balde começa cheio (um minuto de cota) e reabastece na taxa da cota
+    teto = args.rpm + args.rpm * duracao / 60 if args.rpm > 0 else float("inf")
+    rpm_obtido = chamadas["chamadas"] / duracao * 60
+    # Descontada a rajada inicial, o ritmo sustentado deve ficar em até args.rpm
+    rpm_sustentado = max(0, chamadas["chamadas"] - args.rpm) / duracao * 60
+    print(f"{'200':>5} {'falhas':>10} {'chamadas':>9} {'429 fake':>9} {'retentativas':>13} {'429 finais':>11} "
+          f"{'duração (s)':>12} {'RPM obtido':>11} {'RPM sustentado':>15} {'teto (chamadas)':>16}")
+    falhas = ",".join(f"{status}:{n}" for status, n in sorted(erros.items())) or "0"
+    print(f"{len(latencias):>5} {falhas:>10} {chamadas['chamadas']:>9} {chamadas['rejeitadas']:>9} "
+          f"{retentativas:>13.0f} {chamadas['rejeitadas'] - retentativas:>11.0f} {duracao:>12.1f} "
+          f"{rpm_obtido:>11.1f} {rpm_sustentado:>15.1f} {teto:>16.0f}")
+    if chamadas["chamadas"] > teto:
+        sys.exit("Limitador excedeu a cota configurada")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requisicoes", type=int, default=64)
+    parser.add_argument("--abas", type=int, default=10)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--falas", type=int, nargs="+", default=[400])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--latencia", type=float, default=0.5)
+    parser.add_argument("--tokens-por-segundo", type=float, default=400)
+    parser.add_argument("--tokens-resposta", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--limite-em-voo", type=int, default=0, help="MAX_REQUISICOES_EM_VOO por worker (0 = sem teto)")
+    parser.add_argument("--prazo", type=float, default=0, help="PRAZO_REQUISICAO em segundos (0 = sem prazo)")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--tentativas", type=int, default=3, help="tentativas por cliente quando recebe 503")
+    parser.add_argument("--limites", action="store_true", help="roda só o teste do limitador/backoff")
+    parser.add_argument("--rpm", type=float, default=60)
+    parser.add_argument("--tpm", type=float, default=0)
+    parser.add_argument("--taxa-429", type=float, default=0.2)
+    parser.add_argument("--requisicoes-limites", type=int, default=90)
+    parser.add_argument("--backoff-base", type=float, default=0.2)
+    parser.add_argument("--sem-parsing", action="store_true")
+    parser.add_argument("--sem-carga", action="store_true")
+    args = parser.parse_args()
+
+    if args.limites:
+        bench_limites(args)
+        return
+
+    if not args.sem_parsing:
+        bench_parsing([(args.abas, linhas) for linhas in args.linhas], args.repeticoes)
+    if not args.sem_carga:
+        bench_carga(args)
+
+
+if __name__ == "__main__":
+    main()
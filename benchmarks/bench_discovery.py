@@ -0,0 +1,73 @@
+# Benchmark: extração do discovery via pandas (caminho antigo) x openpyxl streaming.
+#
+#   python benchmarks/bench_discovery.py --abas 30 --linhas 500 2000 5000
+#
+# Gera workbooks sintéticos, confere que os dois caminhos produzem exatamente
+# o mesmo texto e mede tempo (melhor de N) e pico de memória Python.
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.dados import gerar_workbook  # noqa: E402
+from discovery import iterar_blocos_discovery  # noqa: E402
+
+
+def extrair_discovery_texto_pandas(arquivo_excel_bytes):
+    # Implementação original de app.py, mantida aqui como referência
+    xls = pd.ExcelFile(BytesIO(arquivo_excel_bytes))
+    abas = [s for s in xls.sheet_names if "SalesDesk" not in s]
+    blocos = []
+    for aba in abas:
+        df = xls.parse(aba).dropna(how='all').dropna(axis=1, how='all')
+        for _, row in df.iterrows():
+            if len(row) >= 3 and pd.notna(row.iloc[1]) and pd.notna(row.iloc[2]):
+                p = str(row.iloc[1]).strip()
+                r = str(row.iloc[2]).strip()
+                blocos.append(f"[{aba}] Pergunta: {p}\nResposta: {r}")
+    return "\n\n".join(blocos)
+
+
+def extrair_discovery_texto_streaming(arquivo_excel_bytes):
+    return "\n\n".join(iterar_blocos_discovery(BytesIO(arquivo_excel_bytes)))
+
+
+def medir(funcao, dados, repeticoes):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(dados)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcao(dados)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, melhor, pico
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--abas", type=int, default=30)
+    parser.add_argument("--linhas", type=int, nargs="+", default=[200, 1000, 3000])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'linhas/aba':>10} {'xlsx (KB)':>10} {'pandas (s)':>11} {'stream (s)':>11} "
+          f"{'speedup':>8} {'mem pandas':>11} {'mem stream':>11}")
+    for linhas in args.linhas:
+        dados = gerar_workbook(args.abas, linhas)
+        ref, t_ref, m_ref = medir(extrair_discovery_texto_pandas, dados, args.repeticoes)
+        novo, t_novo, m_novo = medir(extrair_discovery_texto_streaming, dados, args.repeticoes)
+        if ref != novo:
+            sys.exit(f"Saídas diferentes para {linhas} linhas/aba")
+        print(f"{linhas:>10} {len(dados) // 1024:>10} {t_ref:>11.3f} {t_novo:>11.3f} "
+              f"{t_ref / t_novo:>7.1f}x {m_ref / 2**20:>9.1f}MB {m_novo / 2**20:>9.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# Benchmark: tempo de import e memória residente no cold start.
+#
+#   python benchmarks/bench_startup.py --repeticoes 5
+#
+# Cada medição roda num processo Python novo. "main" é o que o uvicorn
+# carrega para servir a API; "app" é a interface Streamlit, que a API
+# importava inteira antes da separação em core/api/app.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+import {modulo}
+duracao = time.perf_counter() - inicio
+pesados = [m for m in ("streamlit", "pandas", "openai", "openpyxl", "tiktoken") if m in sys.modules]
+print(json.dumps({{"segundos": duracao, "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "pesados": pesados}}))
+"""
+
+
+def medir(modulo, repeticoes):
+    amostras = []
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, "-c", SCRIPT.format(modulo=modulo)],
+            cwd=RAIZ, capture_output=True, text=True, check=True,
+        ).stdout
+        amostras.append(json.loads(saida.strip().splitlines()[-1]))
+    return amostras
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--modulos", nargs="+", default=["main", "core", "app"])
+    args = parser.parse_args()
+
+    print(f"{'módulo':>8} {'import p50 (ms)':>16} {'RSS máx (MB)':>13}  módulos pesados carregados")
+    for modulo in args.modulos:
+        amostras = medir(modulo, args.repeticoes)
+        p50 = statistics.median(a["segundos"] for a in amostras) * 1000
+        rss = max(a["rss_kb"] for a in amostras) / 1024
+        print(f"{modulo:>8} {p50:>16.0f} {rss:>13.1f}  {', '.join(amostras[0]['pesados']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
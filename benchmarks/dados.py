@@ -0,0 +1,42 @@
+# Geradores de entradas sintéticas para os benchmarks (sem rede, determinísticos)
+import random
+from io import BytesIO
+
+from openpyxl import Workbook
+
+TEMAS = ["integrações", "pagamentos", "estoque", "catálogo", "promoções", "frete", "ERP", "WhatsApp"]
+FALAS = [
+    "então, a gente hoje fecha os pedidos pelo televendas",
+    "o boleto faturado só vale para clientes com crédito aprovado",
+    "tipo, o estoque vem do SAP a cada quinze minutos",
+    "a ideia é ter o catálogo completo no WhatsApp até o fim do trimestre",
+    "né, os representantes usam o Mercanet para lançar pedido",
+]
+
+
+def gerar_workbook(abas, linhas, semente=0):
+    rng = random.Random(semente)
+    wb = Workbook(write_only=True)
+    for a in range(abas):
+        nome = f"SalesDesk {a}" if a % 10 == 9 else f"Aba {a}"
+        ws = wb.create_sheet(nome)
+        ws.append(["#", "Pergunta", "Resposta", "Comentário"])
+        for i in range(linhas):
+            tema = rng.choice(TEMAS)
+            resposta = None if i % 7 == 0 else f"Resposta {i} da aba {a} sobre {tema} com algum detalhe"
+            if i % 11 == 0:
+                resposta = i * 10
+            ws.append([i, f"Pergunta {i} sobre {tema} e operação?", resposta, None])
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def gerar_transcricao(falas, semente=0):
+    rng = random.Random(semente)
+    linhas = []
+    for i in range(falas):
+        minuto, segundo = divmod(i * 7, 60)
+        quem = rng.choice(["Consultor", "Cliente", "Cliente 2"])
+        linhas.append(f"[00:{minuto:02d}:{segundo:02d}] {quem}: {rng.choice(FALAS)}")
+    return "\n".join(linhas)
@@ -0,0 +1,94 @@
+# Servidor local compatível com POST /v1/chat/completions da OpenAI, para
+# benchmarks e testes de carga sem rede nem custo:
+#
+#   python benchmarks/servidor_fake.py --porta 8900 --latencia 0.5 --tokens-por-segundo 200
+#   OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=fake uvicorn main:app
+#
+# A latência simulada é latência fixa + tokens gerados / tokens-por-segundo.
+# --taxa-429 devolve 429 numa fração das chamadas para exercitar o backoff.
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+config = {"latencia": 0.5, "tokens_por_segundo": 200.0, "tokens_resposta": 400, "taxa_429": 0.0}
+estatisticas = {"chamadas": 0, "rejeitadas": 0}
+
+app = FastAPI()
+
+
+def _texto(tokens):
+    return " ".join(f"palavra{i % 50}" for i in range(tokens))
+
+
+def _usage(corpo, tokens):
+    prompt = "".join(m.get("content", "") for m in corpo.get("messages", []))
+    return {"prompt_tokens": len(prompt) // 4, "completion_tokens": tokens, "total_tokens": len(prompt) // 4 + tokens}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    corpo = await request.json()
+    estatisticas["chamadas"] += 1
+    if random.random() < config["taxa_429"]:
+        estatisticas["rejeitadas"] += 1
+        return JSONResponse({"error": {"message": "Rate limit", "type": "rate_limit"}}, status_code=429,
+                            headers={"retry-after": "0.5"})
+    tokens = min(config["tokens_resposta"], corpo.get("max_tokens") or config["tokens_resposta"])
+    base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": corpo.get("model", "fake")}
+    await asyncio.sleep(config["latencia"])
+
+    if not corpo.get("stream"):
+        await asyncio.sleep(tokens / config["tokens_por_segundo"])
+        conteudo = _texto(tokens)
+        if (corpo.get("response_format") or {}).get("type") == "json_object":
+            conteudo = json.dumps({"conteudo": conteudo})
+        return {
+            **base,
+            "object": "chat.completion",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": conteudo}}],
+            "usage": _usage(corpo, tokens),
+        }
+
+    async def eventos():
+        lote = 10
+        for i in range(0, tokens, lote):
+            await asyncio.sleep(lote / config["tokens_por_segundo"])
+            delta = {"content": _texto(min(lote, tokens - i)) + " "}
+            pedaco = {**base, "object": "chat.completion.chunk",
+                      "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            yield f"data: {json.dumps(pedaco)}\n\n"
+        fim = {**base, "object": "chat.completion.chunk", "choices": [], "usage": _usage(corpo, tokens)}
+        yield f"data: {json.dumps(fim)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(eventos(), media_type="text/event-stream")
+
+
+@app.get("/estatisticas")
+async def consultar_estatisticas():
+    return estatisticas
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--porta", type=int, default=8900)
+    parser.add_argument("--latencia", type=float, default=config["latencia"])
+    parser.add_argument("--tokens-por-segundo", type=float, default=config["tokens_por_segundo"])
+    parser.add_argument("--tokens-resposta", type=int, default=config["tokens_resposta"])
+    parser.add_argument("--taxa-429", type=float, default=config["taxa_429"])
+    args = parser.parse_args()
+    config.update(latencia=args.latencia, tokens_por_segundo=args.tokens_por_segundo,
+                  tokens_resposta=args.tokens_resposta, taxa_429=args.taxa_429)
+    uvicorn.run(app, host="127.0.0.1", port=args.porta, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from banco import conectar_sqlite
+
+# Cache de relatórios endereçado por conteúdo: a chave é o hash do prompt
+# final + parâmetros do modelo. Camada LRU em memória (limitada em itens e,
+# opcionalmente, em bytes) e, opcionalmente, uma camada SQLite em disco com
+# TTL e limite de tamanho.
+
+
+def chave_cache(prompt, modelo, temperatura, max_tokens, formato=None, versao=None):
+    parametros = {"model": modelo, "temperature": temperatura, "max_tokens": max_tokens}
+    if formato:
+        # Só entra na chave quando usado: não invalida o cache de texto livre
+        parametros["response_format"] = formato
+    if versao:
+        parametros["versao_prompt"] = versao
+    # Parâmetros serializados + prompt em bytes, sem copiar o prompt para dentro de um JSON
+    h = hashlib.sha256(json.dumps(parametros, sort_keys=True).encode("utf-8"))
+    h.update(b"\0")
+    h.update(prompt.encode("utf-8"))
+    return h.hexdigest()
+
+
+class CacheInsights:
+    def __init__(
+        self, max_itens=256, caminho_sqlite=None, ttl_segundos=7 * 24 * 3600, max_bytes_disco=200 * 2**20,
+        max_bytes_memoria=0,
+    ):
+        self.max_itens = max_itens
+        self.max_bytes_memoria = max_bytes_memoria  # 0 = só o limite de itens
+        self._bytes_memoria = 0
+        self.ttl_segundos = ttl_segundos
+        self.max_bytes_disco = max_bytes_disco
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.falhas = 0
+        if caminho_sqlite:
+            self._db = conectar_sqlite(caminho_sqlite)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS insights ("
+                " chave TEXT PRIMARY KEY, valor TEXT NOT NULL, tamanho INTEGER NOT NULL,"
+                " criado_em REAL NOT NULL, acessado_em REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS insights_acessado ON insights (acessado_em)")
+            self._db.commit()
+
+    def obter(self, chave):
+        with self._lock:
+            if chave in self._memoria:
+                self._memoria.move_to_end(chave)
+                self.acertos_memoria += 1
+                return self._memoria[chave][0]
+            valor = self._obter_disco(chave)
+            if valor is None:
+                self.falhas += 1
+                return None
+            self.acertos_disco += 1
+            self._guardar_memoria(chave, valor)
+            return valor
+
+    def guardar(self, chave, valor):
+        with self._lock:
+            self._guardar_memoria(chave, valor)
+            if self._db is not None:
+                agora = time.time()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO insights VALUES (?, ?, ?, ?, ?)",
+                    (chave, valor, len(valor.encode("utf-8")), agora, agora),
+                )
+                self._despejar_disco()
+                self._db.commit()
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos_memoria + self.acertos_disco + self.falhas
+            stats = {
+                "acertos_memoria": self.acertos_memoria,
+                "acertos_disco": self.acertos_disco,
+                "falhas": self.falhas,
+                "taxa_acerto": (self.acertos_memoria + self.acertos_disco) / consultas if consultas else 0.0,
+                "itens_memoria": len(self._memoria),
+                "bytes_memoria": self._bytes_memoria,
+            }
+            if self._db is not None:
+                itens, tamanho = self._db.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM insights").fetchone()
+                stats["itens_disco"] = itens
+                stats["bytes_disco"] = tamanho
+            return stats
+
+    def _guardar_memoria(self, chave, valor):
+        tamanho = len(valor.encode("utf-8"))
+        if chave in self._memoria:
+            self._bytes_memoria -= self._memoria.pop(chave)[1]
+        if self.max_bytes_memoria and tamanho > self.max_bytes_memoria:
+            # Maior que a camada inteira: fica só no disco
+            return
+        self._memoria[chave] = (valor, tamanho)
+        self._bytes_memoria += tamanho
+        while len(self._memoria) > self.max_itens or (
+            self.max_bytes_memoria and self._bytes_memoria > self.max_bytes_memoria
+        ):
+            self._bytes_memoria -= self._memoria.popitem(last=False)[1][1]
+
+    def _obter_disco(self, chave):
+        if self._db is None:
+            return None
+        linha = self._db.execute("SELECT valor, criado_em FROM insights WHERE chave = ?", (chave,)).fetchone()
+        if linha is None:
+            return None
+        valor, criado_em = linha
+        agora = time.time()
+        if agora - criado_em > self.ttl_segundos:
+            self._db.execute("DELETE FROM insights WHERE chave = ?", (chave,))
+            self._db.commit()
+            return None
+        self._db.execute("UPDATE insights SET acessado_em = ? WHERE chave = ?", (agora, chave))
+        self._db.commit()
+        return valor
+
+    def _despejar_disco(self):
+        # Remove expirados e, se ainda acima do limite, os menos acessados
+        self._db.execute("DELETE FROM insights WHERE criado_em < ?", (time.time() - self.ttl_segundos,))
+        (total,) = self._db.execute("SELECT COALESCE(SUM(tamanho), 0) FROM insights").fetchone()
+        if total <= self.max_bytes_disco:
+            return
+        excedente = total - self.max_bytes_disco
+        removidas = []
+        for chave, tamanho in self._db.execute("SELECT chave, tamanho FROM insights ORDER BY acessado_em"):
+            if excedente <= 0:
+                break
+            removidas.append((chave,))
+            excedente -= tamanho
+        self._db.executemany("DELETE FROM insights WHERE chave = ?", removidas)
+
+
+def cache_do_ambiente():
+    return CacheInsights(
+        max_itens=int(os.getenv("INSIGHTS_CACHE_ITENS", "256")),
+        caminho_sqlite=os.getenv("INSIGHTS_CACHE_DB") or None,
+        ttl_segundos=int(os.getenv("INSIGHTS_CACHE_TTL", str(7 * 24 * 3600))),
+        max_bytes_disco=int(os.getenv("INSIGHTS_CACHE_MAX_MB", "200")) * 2**20,
+        max_bytes_memoria=int(os.getenv("INSIGHTS_CACHE_MEMORIA_MB", "0")) * 2**20,
+    )
+
+
+_cache = None
+
+
+def obter_cache():
+    # Singleton por processo (módulo importado sobrevive aos reruns do Streamlit)
+    global _cache
+    if _cache is None:
+        _cache = cache_do_ambiente()
+    return _cache
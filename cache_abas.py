@@ -0,0 +1,80 @@
+import json
+import os
+import zipfile
+from xml.etree.ElementTree import ParseError
+
+from cache import CacheInsights
+from discovery import blocos_das_abas, impressoes_abas, iterar_blocos_discovery
+
+# Reextração incremental do discovery: os blocos de cada aba ficam em cache
+# pela impressão digital da aba, então um workbook levemente editado só tem
+# as abas alteradas reprocessadas. Com DISCOVERY_CACHE_DB apontando para o
+# mesmo arquivo, a API e a interface Streamlit compartilham o cache.
+DISCOVERY_CACHE_ITENS = int(os.getenv("DISCOVERY_CACHE_ITENS", "1024"))
+# Os blocos de uma aba podem ter vários MB: a camada em memória também tem teto em bytes
+DISCOVERY_CACHE_MEMORIA_MB = int(os.getenv("DISCOVERY_CACHE_MEMORIA_MB", "64"))
+DISCOVERY_CACHE_TTL = int(os.getenv("DISCOVERY_CACHE_TTL", str(30 * 24 * 3600)))
+
+_cache = None
+
+
+def obter_cache_abas():
+    global _cache
+    if _cache is None:
+        _cache = CacheInsights(
+            max_itens=DISCOVERY_CACHE_ITENS,
+            caminho_sqlite=os.getenv("DISCOVERY_CACHE_DB") or None,
+            ttl_segundos=DISCOVERY_CACHE_TTL,
+            max_bytes_disco=int(os.getenv("DISCOVERY_CACHE_MAX_MB", "100")) * 2**20,
+            max_bytes_memoria=DISCOVERY_CACHE_MEMORIA_MB * 2**20,
+        )
+    return _cache
+
+
+def _rebobinar(origem):
+    if hasattr(origem, "seek"):
+        origem.seek(0)
+
+
+def comparar_versoes(anteriores, atuais, reprocessadas):
+    # Relatório do que mudou desde a última extração com o mesmo nome
+    return {
+        "abas": len(atuais),
+        "primeira_versao": anteriores is None,
+        "alteradas": [a for a in atuais if anteriores and a in anteriores and anteriores[a] != atuais[a]],
+        "novas": [a for a in atuais if anteriores and a not in anteriores],
+        "removidas": [a for a in (anteriores or {}) if a not in atuais],
+        "reprocessadas": reprocessadas,
+    }
+
+
+def extrair_blocos_incremental(origem, nome=None, extrair=blocos_das_abas):
+    # Devolve (blocos na ordem do workbook, relatório); nome identifica o
+    # workbook entre versões (ex.: cliente + nome do arquivo). extrair(origem, abas)
+    # faz o parsing das abas que faltam (ingestao.py o executa num pool de processos)
+    try:
+        impressoes = impressoes_abas(origem)
+    except (zipfile.BadZipFile, KeyError, ParseError):
+        # Não dá para calcular as impressões: extração completa, sem cache
+        _rebobinar(origem)
+        return list(iterar_blocos_discovery(origem)), None
+    cache = obter_cache_abas()
+    blocos, faltando = {}, []
+    for aba, impressao in impressoes.items():
+        valor = cache.obter(f"aba:{impressao}")
+        if valor is None:
+            faltando.append(aba)
+        else:
+            blocos[aba] = json.loads(valor)
+    if faltando:
+        _rebobinar(origem)
+        for aba, lista in extrair(origem, set(faltando)).items():
+            blocos[aba] = lista
+            cache.guardar(f"aba:{impressoes[aba]}", json.dumps(lista, ensure_ascii=False))
+
+    relatorio = None
+    if nome:
+        anterior = cache.obter(f"versao:{nome}")
+        relatorio = comparar_versoes(json.loads(anterior) if anterior else None, impressoes, faltando)
+        cache.guardar(f"versao:{nome}", json.dumps(impressoes, ensure_ascii=False))
+    return [b for aba in impressoes for b in blocos[aba]], relatorio
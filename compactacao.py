@@ -0,0 +1,147 @@
+import os
+import re
+import unicodedata
+
+from tokens import contar_tokens
+
+# Compactação determinística das fontes antes do prompt: o discovery vira um
+# cabeçalho por aba com "pergunta → resposta", sem respostas vazias ou de
+# placeholder e sem pares repetidos; a transcrição perde timestamps,
+# interjeições e rótulos de quem fala repetidos. Com ORCAMENTO_TOKENS_FONTES
+# definido, respostas e falas longas são encurtadas (todas continuam presentes)
+# até caber no orçamento.
+
+COMPACTAR_PROMPT = os.getenv("COMPACTAR_PROMPT", "1") != "0"
+ORCAMENTO_TOKENS_FONTES = int(os.getenv("ORCAMENTO_TOKENS_FONTES", "0"))
+
+RESPOSTAS_VAZIAS = {
+    "", "-", "--", "—", "?", "...", "…", "n/a", "na", "n.a.", "nan", "none", "null", "tbd",
+    "nao se aplica", "no aplica", "no aplica.", "not applicable", "sem resposta", "sin respuesta",
+}
+
+_REGISTRO = re.compile(
+    r"^\[(?P<aba>[^\]\n]*)\] Pergunta: (?P<pergunta>.*?)\nResposta: (?P<resposta>.*?)"
+    r"(?=\n\n\[[^\]\n]*\] Pergunta: |\Z)",
+    re.DOTALL | re.MULTILINE,
+)
+# Timestamps: entre colchetes/parênteses, HH:MM:SS no início da linha (legendas)
+# ou H:MM no início seguido do rótulo de quem fala. "10:30 é o corte" e "às 10:30" ficam
+_HORA = r"\d{1,2}:\d{2}(?::\d{2})?(?:[.,]\d+)?"
+_HORA_SEGUNDOS = r"\d{1,2}:\d{2}:\d{2}(?:[.,]\d+)?"
+_TIMESTAMP = re.compile(
+    rf"[\[(]{_HORA}(?:\s*-->\s*{_HORA})?[\])]\s*"
+    rf"|^\s*{_HORA_SEGUNDOS}(?:\s*-->\s*{_HORA_SEGUNDOS})?\s*"
+    rf"|^\s*{_HORA}\s*(?=[-–—]?\s*[^\W\d][\w .'-]{{0,40}}?:\s)"
+)
+_INTERJEICOES = re.compile(
+    r"(?<!\w)(?:hum+|hmm+|ãh+n?|uh+m?|umm+|eh+|né|tipo assim|you know|o sea)(?!\w)[,.…]*\s*",
+    re.IGNORECASE,
+)
+_FALANTE = re.compile(r"^(?P<falante>[^\W\d][\w .'-]{0,40}?):\s+(?P<fala>.*)$")
+_ESPACOS = re.compile(r"[ \t]+")
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize("NFKD", texto.strip().lower()).encode("ASCII", "ignore").decode()
+    return _ESPACOS.sub(" ", texto)
+
+
+def resposta_vazia(resposta):
+    return _normalizar(resposta) in RESPOSTAS_VAZIAS
+
+
+def registros_do_texto(discovery_texto):
+    # Reconstrói (aba, pergunta, resposta) do texto gerado por extrair_discovery_texto
+    return [(m["aba"], m["pergunta"], m["resposta"]) for m in _REGISTRO.finditer(discovery_texto)]
+
+
+def compactar_discovery(discovery_texto, limite_resposta=None):
+    registros = registros_do_texto(discovery_texto)
+    if not registros:
+        return discovery_texto
+    vistos = set()
+    por_aba = {}
+    for aba, pergunta, resposta in registros:
+        if resposta_vazia(resposta):
+            continue
+        chave = (_normalizar(pergunta), _normalizar(resposta))
+        if chave in vistos:
+            continue
+        vistos.add(chave)
+        resposta = " ".join(resposta.split())
+        if limite_resposta is not None and len(resposta) > limite_resposta:
+            resposta = resposta[:limite_resposta].rstrip() + "…"
+        por_aba.setdefault(aba, []).append(f"- {' '.join(pergunta.split())} → {resposta}")
+    return "\n\n".join(f"[{aba}]\n" + "\n".join(linhas) for aba, linhas in por_aba.items())
+
+
+def compactar_transcricao(transcricao, limite_fala=None):
+    falas = []  # [falante, texto, última fala juntada]
+    for linha in transcricao.splitlines():
+        linha = _INTERJEICOES.sub("", _TIMESTAMP.sub("", linha))
+        linha = _ESPACOS.sub(" ", linha).strip(" -–—")
+        if not linha:
+            continue
+        m = _FALANTE.match(linha)
+        falante, fala = (m["falante"].strip(), m["fala"].strip()) if m else (None, linha)
+        if not fala:
+            continue
+        if falas and (falante is None or falas[-1][0] == falante):
+            # mesmo falante ou continuação sem rótulo: junta na fala anterior,
+            # a menos que seja a mesma fala repetida (legenda duplicada)
+            if fala != falas[-1][2]:
+                falas[-1][1] += " " + fala
+                falas[-1][2] = fala
+        else:
+            falas.append([falante, fala, fala])
+    linhas = []
+    for falante, fala, _ in falas:
+        if limite_fala is not None and len(fala) > limite_fala:
+            fala = fala[:limite_fala].rstrip() + "…"
+        linhas.append(f"{falante}: {fala}" if falante else fala)
+    return "\n".join(linhas)
+
+
+def _caber(compactar, texto, orcamento):
+    # Maior limite de caracteres por item que faz o texto caber no orçamento
+    completo = compactar(texto, None)
+    if contar_tokens(completo) <= orcamento:
+        return completo
+    baixo = 20
+    melhor = compactar(texto, baixo)
+    if contar_tokens(melhor) > orcamento:
+        # Nem com o limite mínimo cabe: não adianta procurar
+        return melhor
+    # Nenhum item passa do tamanho da maior linha do texto completo
+    alto = max(len(linha) for linha in completo.splitlines())
+    while baixo <= alto:
+        meio = (baixo + alto) // 2
+        candidato = compactar(texto, meio)
+        if contar_tokens(candidato) <= orcamento:
+            melhor, baixo = candidato, meio + 1
+        else:
+            alto = meio - 1
+    return melhor
+
+
+def compactar_fontes(discovery, transcricao, observacoes, orcamento=ORCAMENTO_TOKENS_FONTES):
+    # Devolve (discovery, transcricao, relatório de tokens)
+    antes = contar_tokens(discovery) + contar_tokens(transcricao)
+    if not COMPACTAR_PROMPT:
+        return discovery, transcricao, {"tokens_antes": antes, "tokens_depois": antes, "tokens_economizados": 0}
+    novo_discovery = compactar_discovery(discovery) if discovery else discovery
+    nova_transcricao = compactar_transcricao(transcricao) if transcricao else transcricao
+    tam_discovery, tam_transcricao = contar_tokens(novo_discovery), contar_tokens(nova_transcricao)
+    disponivel = orcamento - contar_tokens(observacoes) if orcamento > 0 else 0
+    if orcamento > 0 and tam_discovery + tam_transcricao > disponivel > 0:
+        # Divide o orçamento proporcionalmente ao tamanho de cada fonte
+        cota_discovery = disponivel * tam_discovery // (tam_discovery + tam_transcricao)
+        if discovery:
+            novo_discovery = _caber(compactar_discovery, discovery, cota_discovery)
+        if transcricao:
+            nova_transcricao = _caber(compactar_transcricao, transcricao, disponivel - cota_discovery)
+        tam_discovery, tam_transcricao = contar_tokens(novo_discovery), contar_tokens(nova_transcricao)
+    depois = tam_discovery + tam_transcricao
+    return novo_discovery, nova_transcricao, {
+        "tokens_antes": antes, "tokens_depois": depois, "tokens_economizados": antes - depois,
+    }
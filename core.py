@@ -0,0 +1,172 @@
+import asyncio
+import unicodedata
+
+from cache_abas import extrair_blocos_incremental
+from compactacao import compactar_fontes
+from indice import indice_para
+from ingestao import extrair_varios
+from llm import completar, completar_async, completar_stream, completar_stream_async
+from mapreduce import condensar_fontes, condensar_fontes_async
+from metricas import medir, registrar_compactacao, tempos_atuais
+from prompts import VERSAO_PROMPTS, montar_contexto, montar_relatorio
+from relatorios import obter_armazem
+from secoes import CONSULTAS, gerar_secoes_async, montar_markdown, validar_secoes
+
+# Motor de extração compartilhado pela API (api.py) e pela interface (app.py):
+# parsing do discovery, montagem dos prompts e geração. Não importa Streamlit,
+# FastAPI, pandas nem openai no carregamento do módulo.
+
+
+class ErroDiscovery(ValueError):
+    pass
+
+
+def extrair_discovery_texto(arquivo_excel, nome=None):
+    # arquivo_excel: caminho ou objeto file-like de um .xlsx
+    return extrair_discovery_incremental(arquivo_excel, nome)[0]
+
+
+def extrair_discoveries(arquivos, prefixo_versao=None):
+    # Vários workbooks [(nome, origem)] em paralelo: (texto mesclado, relatórios por arquivo)
+    try:
+        with medir("parsing_excel"):
+            blocos, relatorios = extrair_varios(arquivos, prefixo_versao)
+    except Exception as e:
+        raise ErroDiscovery(f"Erro ao processar Excel: {e}") from e
+    return "\n\n".join(blocos), relatorios
+
+
+def extrair_discovery_incremental(arquivo_excel, nome=None):
+    # (texto, relatório de abas alteradas desde a última versão com o mesmo nome)
+    try:
+        with medir("parsing_excel"):
+            blocos, relatorio = extrair_blocos_incremental(arquivo_excel, nome)
+    except Exception as e:
+        raise ErroDiscovery(f"Erro ao processar Excel: {e}") from e
+    return "\n\n".join(blocos), relatorio
+
+
+# Função para normalizar o idioma (remove acentos, caixa e espaços)
+def normalizar_idioma(texto):
+    texto = texto.strip().lower()
+    texto = unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('utf-8')
+    return texto
+
+
+# Dicionário com chaves sem acento
+idiomas_suportados = {
+    "portugues": "portuguese",
+    "espanol": "spanish",
+    "english": "english"
+}
+
+
+def montar_prompt(discovery, transcricao, observacoes, cliente, idioma):
+    # Um só prompt por idioma para API e interface (registro em prompts.py)
+    return montar_relatorio(discovery, transcricao, observacoes, cliente, idioma)
+
+
+def _preparar_prompt(discovery, transcricao, observacoes, cliente, idioma):
+    with medir("montagem_prompt"):
+        return montar_prompt(discovery, transcricao, observacoes, cliente, idioma)
+
+
+def _compactar(discovery, transcricao, observacoes):
+    with medir("compactacao"):
+        discovery, transcricao, relatorio = compactar_fontes(discovery, transcricao, observacoes)
+    registrar_compactacao(relatorio)
+    return discovery, transcricao
+
+
+async def _compactar_async(discovery, transcricao, observacoes):
+    # CPU puro: fora do event loop para não travar as outras requisições do worker
+    return await asyncio.to_thread(_compactar, discovery, transcricao, observacoes)
+
+
+def registrar_relatorio(cliente, idioma, texto, entradas, secoes=None, modo="completo"):
+    # Guarda a execução no histórico (relatorios.py); devolve o id ou None se desligado.
+    # Nos caminhos async roda em thread: o SQLite pode esperar o lock de outro worker
+    armazem = obter_armazem()
+    if armazem is None:
+        return None
+    with medir("historico"):
+        return armazem.salvar(cliente, idioma, texto, entradas, secoes, modo, VERSAO_PROMPTS, tempos_atuais())
+
+
+def gerar_insights(discovery, transcricao, observacoes, cliente, idioma):
+    entradas = (discovery, transcricao, observacoes)
+    discovery, transcricao = _compactar(discovery, transcricao, observacoes)
+    with medir("condensacao"):
+        discovery, transcricao = condensar_fontes(discovery, transcricao, observacoes, idioma)
+    prompt = _preparar_prompt(discovery, transcricao, observacoes, cliente, idioma)
+    insights = completar(prompt, versao=VERSAO_PROMPTS)
+    registrar_relatorio(cliente, idioma, insights, entradas)
+    return insights
+
+
+def gerar_insights_stream(discovery, transcricao, observacoes, cliente, idioma):
+    entradas = (discovery, transcricao, observacoes)
+    discovery, transcricao = _compactar(discovery, transcricao, observacoes)
+    with medir("condensacao"):
+        discovery, transcricao = condensar_fontes(discovery, transcricao, observacoes, idioma)
+    prompt = _preparar_prompt(discovery, transcricao, observacoes, cliente, idioma)
+    trechos = []
+    for trecho in completar_stream(prompt, versao=VERSAO_PROMPTS):
+        trechos.append(trecho)
+        yield trecho
+    registrar_relatorio(cliente, idioma, "".join(trechos), entradas)
+
+
+async def gerar_insights_async(discovery, transcricao, observacoes, cliente, idioma):
+    entradas = (discovery, transcricao, observacoes)
+    discovery, transcricao = await _compactar_async(discovery, transcricao, observacoes)
+    with medir("condensacao"):
+        discovery, transcricao = await condensar_fontes_async(discovery, transcricao, observacoes, idioma)
+    prompt = _preparar_prompt(discovery, transcricao, observacoes, cliente, idioma)
+    insights = await completar_async(prompt, versao=VERSAO_PROMPTS)
+    await asyncio.to_thread(registrar_relatorio, cliente, idioma, insights, entradas)
+    return insights
+
+
+async def gerar_insights_stream_async(discovery, transcricao, observacoes, cliente, idioma):
+    entradas = (discovery, transcricao, observacoes)
+    discovery, transcricao = await _compactar_async(discovery, transcricao, observacoes)
+    with medir("condensacao"):
+        discovery, transcricao = await condensar_fontes_async(discovery, transcricao, observacoes, idioma)
+    prompt = _preparar_prompt(discovery, transcricao, observacoes, cliente, idioma)
+    trechos = []
+    async for trecho in completar_stream_async(prompt, versao=VERSAO_PROMPTS):
+        trechos.append(trecho)
+        yield trecho
+    await asyncio.to_thread(registrar_relatorio, cliente, idioma, "".join(trechos), entradas)
+
+
+async def gerar_insights_secoes_async(discovery, transcricao, observacoes, cliente, idioma, secoes=None, regenerar=False):
+    # Relatório seção a seção em paralelo: {"insights": markdown, "secoes": [{secao, titulo, conteudo}]}
+    secoes = validar_secoes(secoes)
+    entradas = (discovery, transcricao, observacoes)
+    # Tokenização, BM25 e compactação por seção são CPU puro: rodam em thread
+    with medir("indexacao"):
+        indice = await asyncio.to_thread(indice_para, discovery)
+    if indice is not None:
+        # Discovery grande: cada seção recebe só os registros relevantes do índice
+        with medir("recuperacao"):
+            discoveries = await asyncio.to_thread(lambda: {c: indice.texto(CONSULTAS[c]) for c in secoes})
+        discovery = ""
+    discovery, transcricao = await _compactar_async(discovery, transcricao, observacoes)
+    with medir("condensacao"):
+        discovery, transcricao = await condensar_fontes_async(discovery, transcricao, observacoes, idioma)
+    with medir("montagem_prompt"):
+        if indice is None:
+            contexto = montar_contexto(discovery, transcricao, observacoes, cliente, idioma)
+        else:
+            contexto = await asyncio.to_thread(lambda: {
+                c: montar_contexto(compactar_fontes(d, "", observacoes)[0], transcricao, observacoes, cliente, idioma)
+                for c, d in discoveries.items()
+            })
+    with medir("geracao_secoes"):
+        resultado = await gerar_secoes_async(contexto, idioma, secoes, regenerar)
+    insights = montar_markdown(resultado)
+    por_secao = {s["secao"]: s["conteudo"] for s in resultado}
+    id_relatorio = await asyncio.to_thread(registrar_relatorio, cliente, idioma, insights, entradas, por_secao, "secoes")
+    return {"insights": insights, "secoes": resultado, "id_relatorio": id_relatorio}
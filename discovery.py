@@ -0,0 +1,316 @@
+import hashlib
+import re
+
+# Leitura do discovery em modo streaming (openpyxl read-only), sem montar
+# DataFrames. Reproduz o texto que o caminho antigo com pandas gerava:
+# cabeçalho na 1ª linha, colunas totalmente vazias descartadas, pergunta na
+# 2ª e resposta na 3ª coluna restante, e a mesma formatação de valores.
+
+# Mesmos marcadores que o pandas trata como NaN ao ler o Excel
+VALORES_NA = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+}
+VALORES_VERDADEIROS = {"True", "TRUE", "true"}
+VALORES_FALSOS = {"False", "FALSE", "false"}
+
+# Mesmos valores de openpyxl.cell.cell (openpyxl só é importado ao ler um arquivo)
+TYPE_ERROR = "e"
+TYPE_NUMERIC = "n"
+
+_NAN = object()
+
+
+def _converter_celula(cell):
+    valor = cell.value
+    if valor is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return _NAN
+    if cell.data_type == TYPE_NUMERIC:
+        inteiro = int(valor)
+        return inteiro if inteiro == valor else float(valor)
+    return valor
+
+
+def _eh_nan(valor):
+    return valor is _NAN or (isinstance(valor, str) and valor in VALORES_NA)
+
+
+def _numero_em_texto(texto):
+    if "_" in texto:
+        return None
+    try:
+        return int(texto)
+    except ValueError:
+        pass
+    try:
+        return float(texto)
+    except ValueError:
+        return None
+
+
+class _Coluna:
+    # Estatísticas mínimas para decidir o dtype que o pandas daria à coluna
+    __slots__ = ("valores", "primeiro", "numerica", "so_bool", "tem_float", "booleana")
+
+    def __init__(self):
+        self.valores = 0
+        self.primeiro = _NAN
+        self.numerica = True
+        self.so_bool = True
+        self.tem_float = False
+        self.booleana = True
+
+    @property
+    def texto(self):
+        # Coluna object sem conversão possível: valores saem como str()
+        return not self.numerica and not self.booleana
+
+    def observar(self, valor, linha):
+        if linha == 0:
+            self.primeiro = valor
+        self.valores += 1
+        if isinstance(valor, bool):
+            return
+        self.so_bool = False
+        if isinstance(valor, int):
+            self.booleana = False
+        elif isinstance(valor, float):
+            self.booleana = False
+            self.tem_float = True
+        elif isinstance(valor, str) and (valor in VALORES_VERDADEIROS or valor in VALORES_FALSOS):
+            self.numerica = False
+        elif isinstance(valor, str) and self.numerica:
+            self.booleana = False
+            numero = _numero_em_texto(valor)
+            if numero is None:
+                self.numerica = False
+            elif isinstance(numero, float):
+                self.tem_float = True
+        else:
+            self.numerica = False
+            self.booleana = False
+
+    def tipo(self, total_linhas):
+        if not self.numerica:
+            return "object"
+        if self.so_bool and self.valores == total_linhas:
+            return "bool"
+        if self.tem_float or self.valores < total_linhas:
+            return "float"
+        return "int"
+
+    def formatar(self, valor, total_linhas, tipo_linha):
+        # iterrows() converte a linha inteira para o dtype comum das colunas
+        tipo = tipo_linha if tipo_linha != "object" else self.tipo(total_linhas)
+        if tipo in ("int", "float"):
+            if isinstance(valor, str):
+                valor = _numero_em_texto(valor)
+            return str(float(valor)) if tipo == "float" else str(int(valor))
+        if tipo == "object" and self.booleana and not isinstance(self.primeiro, int):
+            return str(valor is True or valor in VALORES_VERDADEIROS)
+        return str(valor)
+
+
+def _tipo_comum(tipos):
+    tipos = set(tipos)
+    if tipos <= {"int", "float"}:
+        return "float" if "float" in tipos else "int"
+    if tipos == {"bool"}:
+        return "bool"
+    return "object"
+
+
+def _pares(linhas, alvo):
+    pares = []
+    for linha in linhas:
+        celulas = dict(linha)
+        if alvo[0] in celulas and alvo[1] in celulas:
+            pares.append((celulas[alvo[0]], celulas[alvo[1]]))
+    return pares
+
+
+def _bloco(aba, pergunta, resposta):
+    return f"[{aba}] Pergunta: {pergunta.strip()}\nResposta: {resposta.strip()}"
+
+
+def _blocos_da_aba(aba, sheet):
+    sheet.reset_dimensions()
+    colunas = {}
+    total_linhas = 0
+    alvo = None  # (coluna da pergunta, coluna da resposta) quando já definidas
+    pendentes = []  # linhas candidatas enquanto o formato ainda não é conhecido
+
+    linhas = iter(sheet.rows)
+    next(linhas, None)  # 1ª linha = cabeçalho
+    for indice, row in enumerate(linhas):
+        preenchidas = []
+        vazia = True
+        for c, cell in enumerate(row):
+            valor = _converter_celula(cell)
+            if valor == "":
+                continue
+            vazia = False
+            if _eh_nan(valor):
+                continue
+            coluna = colunas.get(c)
+            if coluna is None:
+                coluna = colunas[c] = _Coluna()
+            coluna.observar(valor, indice)
+            preenchidas.append((c, valor))
+        if vazia:
+            continue
+        total_linhas = indice + 1
+
+        if alvo is None and 0 in colunas and 1 in colunas and 2 in colunas:
+            # Nenhuma coluna à esquerda pode mais aparecer: pergunta/resposta fixadas
+            alvo = (1, 2)
+            pendentes = _pares(pendentes, alvo)
+
+        if alvo is None:
+            if len(preenchidas) >= 2:
+                pendentes.append(preenchidas)
+            continue
+
+        pendentes.extend(_pares([preenchidas], alvo))
+        if pendentes and colunas[alvo[0]].texto and colunas[alvo[1]].texto:
+            # Colunas já são texto: o formato não muda mais, pode escoar
+            for p, r in pendentes:
+                yield _bloco(aba, str(p), str(r))
+            pendentes = []
+
+    if alvo is None:
+        ordem = sorted(colunas)
+        if len(ordem) < 3:
+            return
+        alvo = (ordem[1], ordem[2])
+        pendentes = _pares(pendentes, alvo)
+
+    col_p, col_r = colunas[alvo[0]], colunas[alvo[1]]
+    tipo_linha = _tipo_comum(coluna.tipo(total_linhas) for coluna in colunas.values())
+    for p, r in pendentes:
+        p = col_p.formatar(p, total_linhas, tipo_linha)
+        r = col_r.formatar(r, total_linhas, tipo_linha)
+        yield _bloco(aba, p, r)
+
+
+def _ignorar_aba(aba):
+    return "SalesDesk" in aba
+
+
+def iterar_blocos_discovery(origem):
+    # origem: caminho ou objeto file-like de um .xlsx
+    from openpyxl import load_workbook
+
+    wb = load_workbook(origem, read_only=True, data_only=True, keep_links=False)
+    try:
+        for aba in wb.sheetnames:
+            if _ignorar_aba(aba):
+                continue
+            yield from _blocos_da_aba(aba, wb[aba])
+    finally:
+        wb.close()
+
+
+def blocos_das_abas(origem, abas):
+    # {aba: [blocos]} só das abas pedidas; em read-only as demais nem são lidas
+    from openpyxl import load_workbook
+
+    wb = load_workbook(origem, read_only=True, data_only=True, keep_links=False)
+    try:
+        return {aba: list(_blocos_da_aba(aba, wb[aba])) for aba in wb.sheetnames if aba in abas}
+    finally:
+        wb.close()
+
+
+# Impressão digital por aba, lida direto do zip do .xlsx sem passar pelo
+# openpyxl: células da aba com cada índice de string compartilhada trocado pelo
+# <si> que ele referencia (o Excel renumera a tabela quando outra aba ganha uma
+# string nova, e isso não é edição) + estilos (definem datas/números) + flag
+# date1904. Mudou o parser, muda VERSAO_PARSER.
+VERSAO_PARSER = "1"
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_SI = re.compile(rb"<si\b[^>]*/>|<si\b.*?</si>", re.DOTALL)
+TAMANHO_BLOCO_XML = 2**20
+_REF_STRING = re.compile(rb'(<c\b[^>]*\bt="s"[^>]*>\s*)<v>(\d+)</v>')
+
+
+def _resolver_string(m, compartilhadas):
+    # <c t="s"><v>N</v></c> -> <c t="s"><si>...</si></c>: o valor, não a posição na tabela
+    i = int(m.group(2))
+    return m.group(1) + (compartilhadas[i] if i < len(compartilhadas) else m.group(0)[len(m.group(1)):])
+
+
+def _hash_celulas(arquivo, h, compartilhadas, inteiro=False):
+    # Lê o XML da aba em blocos (memória constante) e alimenta h só com o
+    # <sheetData>, índices de strings já resolvidos. Cada trecho processado
+    # termina num "</c>", então nenhuma célula fica dividida entre dois blocos.
+    # Devolve (achou <sheetData>, tem t="s" que a regex não resolveu)
+    pendente, dentro, trocas, tem_referencias = b"", inteiro, 0, False
+    while True:
+        bloco = arquivo.read(TAMANHO_BLOCO_XML)
+        pendente += bloco
+        if not dentro:
+            inicio = pendente.find(b"<sheetData")
+            if inicio < 0:
+                if not bloco:
+                    return False, False
+                pendente = pendente[-len(b"<sheetData"):]
+                continue
+            pendente, dentro = pendente[inicio:], True
+        fim = -1 if inteiro else pendente.find(b"</sheetData>")
+        if fim >= 0 or not bloco:
+            corte = fim if fim >= 0 else len(pendente)
+        else:
+            corte = pendente.rfind(b"</c>")
+            corte = corte + len(b"</c>") if corte >= 0 else 0
+        trecho, pendente = pendente[:corte], pendente[corte:]
+        resolvido, n = _REF_STRING.subn(lambda m: _resolver_string(m, compartilhadas), trecho)
+        h.update(resolvido)
+        trocas += n
+        tem_referencias = tem_referencias or b't="s"' in trecho
+        if fim >= 0 or not bloco:
+            return True, tem_referencias and not trocas
+
+
+def impressoes_abas(origem):
+    # {aba: sha256} na ordem do workbook, sem as abas ignoradas
+    import xml.etree.ElementTree as ET
+    import zipfile
+
+    with zipfile.ZipFile(origem) as z:
+        nomes = set(z.namelist())
+        workbook = ET.fromstring(z.read("xl/workbook.xml"))
+        rels = ET.fromstring(z.read("xl/_rels/workbook.xml.rels"))
+        alvos = {r.get("Id"): r.get("Target") for r in rels}
+        compartilhadas = _SI.findall(z.read("xl/sharedStrings.xml")) if "xl/sharedStrings.xml" in nomes else []
+        base = hashlib.sha256(VERSAO_PARSER.encode())
+        if "xl/styles.xml" in nomes:
+            base.update(z.read("xl/styles.xml"))
+        propriedades = workbook.find(f"{_NS_MAIN}workbookPr")
+        base.update(str(propriedades is not None and propriedades.get("date1904")).encode())
+
+        impressoes = {}
+        for sheet in workbook.iter(f"{_NS_MAIN}sheet"):
+            aba = sheet.get("name")
+            if _ignorar_aba(aba):
+                continue
+            alvo = alvos[sheet.get(f"{_NS_REL}id")]
+            caminho = alvo.lstrip("/") if alvo.startswith("/") else f"xl/{alvo}"
+            h = base.copy()
+            h.update(aba.encode())
+            # Só as células importam: seleção, zoom e aba ativa mudam a cada save do Excel
+            with z.open(caminho) as arquivo:
+                achou, sem_resolver = _hash_celulas(arquivo, h, compartilhadas)
+            if not achou:
+                with z.open(caminho) as arquivo:
+                    _, sem_resolver = _hash_celulas(arquivo, h, compartilhadas, inteiro=True)
+            if sem_resolver:
+                # XML com prefixo de namespace ou formato inesperado: usa todas as strings
+                for si in compartilhadas:
+                    h.update(si)
+            impressoes[aba] = h.hexdigest()
+        return impressoes
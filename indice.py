@@ -0,0 +1,110 @@
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from compactacao import registros_do_texto, resposta_vazia
+from tokens import contar_tokens
+
+# Índice BM25 em memória sobre os registros (aba, pergunta, resposta) do
+# discovery, para que cada seção do relatório receba só os registros
+# relevantes em vez do workbook inteiro. Feito com NumPy, sem serviço
+# externo; os índices ficam num LRU por hash do texto do discovery (que é
+# derivado deterministicamente do workbook).
+RECUPERACAO_MIN_TOKENS = int(os.getenv("RECUPERACAO_MIN_TOKENS", "4000"))  # abaixo disso vai tudo
+RECUPERACAO_TOP_K = int(os.getenv("RECUPERACAO_TOP_K", "40"))
+INDICES_EM_CACHE = int(os.getenv("INDICES_EM_CACHE", "16"))
+K1 = 1.5
+B = 0.75
+
+# Radical por truncamento: "integração", "integraciones" e "integration" viram "integr"
+TAMANHO_RADICAL = 6
+_PALAVRA = re.compile(r"\w+")
+STOPWORDS = {
+    "para", "com", "que", "uma", "dos", "das", "por", "como", "mais", "nao", "sim", "sao", "tem", "ser",
+    "los", "las", "del", "con", "una", "por", "que", "como", "mas", "son", "hay",
+    "the", "and", "for", "with", "are", "you", "your", "does", "what", "how", "which", "yes",
+    "pergunta", "resposta",
+}
+
+
+def termos(texto):
+    texto = unicodedata.normalize("NFKD", texto.lower()).encode("ASCII", "ignore").decode()
+    return [p[:TAMANHO_RADICAL] for p in _PALAVRA.findall(texto) if len(p) > 2 and p not in STOPWORDS]
+
+
+class IndiceBM25:
+    def __init__(self, registros):
+        import numpy as np
+
+        self.registros = registros
+        self._vocabulario = {}
+        linhas, colunas = [], []
+        for i, (aba, pergunta, resposta) in enumerate(registros):
+            for termo in termos(f"{aba} {pergunta} {resposta}"):
+                colunas.append(self._vocabulario.setdefault(termo, len(self._vocabulario)))
+                linhas.append(i)
+        n = max(len(registros), 1)
+        linhas = np.asarray(linhas, dtype=np.int64)
+        # Postings ordenados por termo e registro: (termo * n + registro) único -> frequência
+        pares, frequencias = np.unique(np.asarray(colunas, dtype=np.int64) * n + linhas, return_counts=True)
+        termo_do_par = pares // n
+        self._docs = pares % n
+        self._tf = frequencias.astype(np.float64)
+        self._inicio = np.searchsorted(termo_do_par, np.arange(len(self._vocabulario) + 1))
+        df = np.diff(self._inicio)
+        self._idf = np.log(1 + (len(registros) - df + 0.5) / (df + 0.5))
+        comprimentos = np.bincount(linhas, minlength=len(registros)).astype(np.float64)
+        media = comprimentos.mean() if len(registros) else 1.0
+        self._norma = K1 * (1 - B + B * comprimentos / max(media, 1.0))
+
+    def buscar(self, consulta, k=RECUPERACAO_TOP_K):
+        # Índices dos k registros mais relevantes, na ordem original do workbook
+        import numpy as np
+
+        pontuacao = np.zeros(len(self.registros))
+        for termo in set(termos(consulta)):
+            j = self._vocabulario.get(termo)
+            if j is None:
+                continue
+            inicio, fim = self._inicio[j], self._inicio[j + 1]
+            docs, tf = self._docs[inicio:fim], self._tf[inicio:fim]
+            pontuacao[docs] += self._idf[j] * tf * (K1 + 1) / (tf + self._norma[docs])
+        melhores = np.argsort(-pontuacao, kind="stable")[:k]
+        return sorted(int(i) for i in melhores if pontuacao[i] > 0)
+
+    def texto(self, consulta, k=RECUPERACAO_TOP_K):
+        # Mesmo formato de extrair_discovery_texto, só com os registros recuperados
+        return "\n\n".join(
+            f"[{aba}] Pergunta: {pergunta}\nResposta: {resposta}"
+            for aba, pergunta, resposta in (self.registros[i] for i in self.buscar(consulta, k))
+        )
+
+
+_indices = OrderedDict()
+_lock = threading.Lock()
+
+
+def indice_para(discovery_texto):
+    # None quando o discovery é pequeno o bastante para ir inteiro em cada seção
+    if not discovery_texto or contar_tokens(discovery_texto) < RECUPERACAO_MIN_TOKENS:
+        return None
+    indice = obter_indice(discovery_texto)
+    return indice if indice.registros else None
+
+
+def obter_indice(discovery_texto):
+    chave = hashlib.sha256(discovery_texto.encode("utf-8")).hexdigest()
+    with _lock:
+        if chave in _indices:
+            _indices.move_to_end(chave)
+            return _indices[chave]
+    registros = [r for r in registros_do_texto(discovery_texto) if not resposta_vazia(r[2])]
+    indice = IndiceBM25(registros)
+    with _lock:
+        _indices[chave] = indice
+        while len(_indices) > INDICES_EM_CACHE:
+            _indices.popitem(last=False)
+    return indice
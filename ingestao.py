@@ -0,0 +1,83 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from cache_abas import extrair_blocos_incremental
+from discovery import blocos_das_abas
+
+# Discovery dividido em vários workbooks (por unidade de negócio ou país):
+# cada arquivo passa pelo cache por aba de cache_abas.py e as abas que faltam
+# são lidas num pool de processos, então o tempo total fica perto do maior
+# arquivo e não da soma. O resultado é mesclado em ordem determinística (nome
+# do arquivo) e sem blocos repetidos entre arquivos.
+DISCOVERY_PROCESSOS = int(os.getenv("DISCOVERY_PROCESSOS", str(min(4, os.cpu_count() or 1))))
+MAX_ARQUIVOS_DISCOVERY = int(os.getenv("MAX_ARQUIVOS_DISCOVERY", "10"))
+
+_pool = None
+_lock = threading.Lock()
+
+
+def obter_pool():
+    # spawn: filhos não herdam threads nem o estado do servidor/Streamlit
+    global _pool
+    with _lock:
+        if _pool is None:
+            import multiprocessing
+
+            _pool = ProcessPoolExecutor(DISCOVERY_PROCESSOS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def encerrar_pool():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _extrair_no_pool(origem, abas):
+    return obter_pool().submit(blocos_das_abas, origem, abas).result()
+
+
+def rotular(bloco, arquivo):
+    # "[aba] Pergunta: ..." -> "[arquivo / aba] Pergunta: ...". Colchetes no nome do
+    # arquivo quebrariam o parsing dos registros (compactacao/indice); nomes de aba
+    # não podem tê-los no Excel
+    arquivo = arquivo.replace("[", "(").replace("]", ")")
+    return f"[{arquivo} / {bloco[1:]}"
+
+
+def extrair_varios(arquivos, prefixo_versao=None):
+    # arquivos: lista de (nome, origem); origem = caminho ou BytesIO (vai para
+    # outro processo, então precisa ser picklable). Devolve (blocos, relatórios)
+    arquivos = sorted(arquivos, key=lambda arquivo: arquivo[0])
+
+    def extrair(arquivo, extrair_abas):
+        nome, origem = arquivo
+        try:
+            return extrair_blocos_incremental(
+                origem, f"{prefixo_versao}/{nome}" if prefixo_versao else None, extrair_abas
+            )
+        except Exception as e:
+            raise ValueError(f"{nome}: {e}") from e
+
+    if len(arquivos) == 1:
+        blocos, relatorio = extrair(arquivos[0], blocos_das_abas)
+        return blocos, relatorio and [{"arquivo": arquivos[0][0], **relatorio}]
+
+    with ThreadPoolExecutor(len(arquivos)) as threads:
+        resultados = list(threads.map(lambda arquivo: extrair(arquivo, _extrair_no_pool), arquivos))
+
+    vistos, blocos, relatorios = set(), [], []
+    for (nome, _), (lista, relatorio) in zip(arquivos, resultados):
+        rotulo = os.path.splitext(os.path.basename(nome))[0]
+        for bloco in lista:
+            # A mesma aba copiada em dois workbooks entra uma vez só
+            if bloco in vistos:
+                continue
+            vistos.add(bloco)
+            blocos.append(rotular(bloco, rotulo))
+        if relatorio:
+            relatorios.append({"arquivo": nome, **relatorio})
+    return blocos, relatorios or None
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+from io import BytesIO
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from banco import conectar_sqlite
+from core import extrair_discoveries, gerar_insights_async
+from metricas import requisicao
+
+# Fila de jobs para geração em lote: os pedidos são gravados no SQLite e
+# respondidos na hora com o id; um pool de workers assíncronos executa
+# gerar_insights_async respeitando paralelismo e limite de jobs por minuto.
+# O estado sobrevive a reinícios e é compartilhado entre processos (uvicorn
+# --workers): cada job tem um prazo, e um job "executando" há mais que o dobro
+# dele (processo que morreu no meio) volta a ser reservável por qualquer worker.
+# Jobs de lote guardam o .xlsx original (discovery_xlsx) e o parsing acontece
+# no worker, dentro do prazo do job, e não na requisição que criou o lote.
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB = os.getenv("JOBS_DB", "jobs.db")
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "4"))
+JOBS_POR_MINUTO = float(os.getenv("JOBS_POR_MINUTO", "30"))
+JOBS_PRAZO = float(os.getenv("JOBS_PRAZO", "600"))  # segundos por job; a geração é cancelada ao estourar
+ESPERA_ERRO_SQLITE = 1.0  # segundos antes de tentar de novo quando o banco falha (ex.: lock)
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+
+
+class ArmazemJobs:
+    def __init__(self, caminho, prazo=JOBS_PRAZO):
+        self.prazo = prazo
+        self._db = conectar_sqlite(caminho)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, lote TEXT, estado TEXT NOT NULL,"
+                " cliente TEXT NOT NULL, idioma TEXT NOT NULL, discovery TEXT NOT NULL,"
+                " transcricao TEXT NOT NULL, observacoes TEXT NOT NULL,"
+                " resultado TEXT, erro TEXT, tentativas INTEGER NOT NULL DEFAULT 0,"
+                " criado_em REAL NOT NULL, iniciado_em REAL, concluido_em REAL, discovery_xlsx BLOB)"
+            )
+            colunas = {linha["name"] for linha in self._db.execute("PRAGMA table_info(jobs)")}
+            if "discovery_xlsx" not in colunas:
+                # Banco criado antes da coluna existir
+                self._db.execute("ALTER TABLE jobs ADD COLUMN discovery_xlsx BLOB")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_fila ON jobs (estado, criado_em)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_lote ON jobs (lote)")
+            self._db.commit()
+
+    def criar(self, entradas, lote=None):
+        # entradas: lista de dicts com cliente, idioma, discovery, transcricao, observacoes
+        # e, opcionalmente, discovery_xlsx (bytes do workbook, extraído pelo worker)
+        agora = time.time()
+        ids = [uuid.uuid4().hex for _ in entradas]
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO jobs (id, lote, estado, cliente, idioma, discovery, transcricao, observacoes, criado_em,"
+                " discovery_xlsx) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        id_, lote, PENDENTE, e["cliente"], e["idioma"], e["discovery"], e["transcricao"],
+                        e["observacoes"], agora, e.get("discovery_xlsx"),
+                    )
+                    for id_, e in zip(ids, entradas)
+                ],
+            )
+            self._db.commit()
+        return ids
+
+    def reservar_proximo(self):
+        # UPDATE ... RETURNING atômico: dois processos nunca reservam o mesmo job.
+        # Jobs interrompidos (reinício, worker morto) voltam depois de 2x o prazo
+        agora = time.time()
+        with self._lock:
+            linha = self._db.execute(
+                "UPDATE jobs SET estado = ?, iniciado_em = ?, tentativas = tentativas + 1"
+                " WHERE id = (SELECT id FROM jobs WHERE estado = ? OR (estado = ? AND iniciado_em < ?)"
+                " ORDER BY criado_em LIMIT 1)"
+                " RETURNING *",
+                (EXECUTANDO, agora, PENDENTE, EXECUTANDO, agora - 2 * self.prazo),
+            ).fetchone()
+            self._db.commit()
+        return dict(linha) if linha else None
+
+    def finalizar(self, id_, resultado=None, erro=None):
+        # O workbook só serve até o job terminar: libera o espaço no banco
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET estado = ?, resultado = ?, erro = ?, concluido_em = ?, discovery_xlsx = NULL"
+                " WHERE id = ?",
+                (ERRO if erro else CONCLUIDO, resultado, erro, time.time(), id_),
+            )
+            self._db.commit()
+
+    def obter(self, id_):
+        with self._lock:
+            linha = self._db.execute(
+                "SELECT id, lote, estado, cliente, idioma, resultado, erro, tentativas,"
+                " criado_em, iniciado_em, concluido_em FROM jobs WHERE id = ?",
+                (id_,),
+            ).fetchone()
+        return dict(linha) if linha else None
+
+    def resumo_lote(self, lote):
+        with self._lock:
+            linhas = self._db.execute(
+                "SELECT id, estado FROM jobs WHERE lote = ? ORDER BY criado_em, rowid", (lote,)
+            ).fetchall()
+        return [dict(linha) for linha in linhas]
+
+
+class LimiteTaxa:
+    # Espaça o início dos jobs para não passar de `por_minuto`
+    def __init__(self, por_minuto):
+        self.intervalo = 60.0 / por_minuto if por_minuto > 0 else 0.0
+        self._proximo = 0.0
+        self._lock = asyncio.Lock()
+
+    async def aguardar(self):
+        async with self._lock:
+            agora = time.monotonic()
+            espera = self._proximo - agora
+            self._proximo = max(agora, self._proximo) + self.intervalo
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+
+class FilaJobs:
+    def __init__(self, armazem, workers=JOBS_WORKERS, por_minuto=JOBS_POR_MINUTO, gerar=gerar_insights_async):
+        self.armazem = armazem
+        self.workers = workers
+        self.gerar = gerar
+        self._limite = LimiteTaxa(por_minuto)
+        self._novo_job = asyncio.Event()
+        self._tarefas = []
+
+    async def submeter(self, entradas, lote=None):
+        ids = await asyncio.to_thread(self.armazem.criar, entradas, lote)
+        self._novo_job.set()
+        return ids
+
+    def iniciar(self):
+        self._tarefas = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def parar(self):
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+
+    async def _finalizar(self, id_, resultado=None, erro=None):
+        try:
+            await asyncio.to_thread(self.armazem.finalizar, id_, resultado, erro)
+        except sqlite3.Error:
+            # O job continua "executando" e volta à fila depois de 2x o prazo
+            logger.exception("Não foi possível gravar o fim do job %s", id_)
+
+    async def _executar(self, job):
+        discovery = job["discovery"]
+        if job["discovery_xlsx"]:
+            discovery, _ = await asyncio.to_thread(
+                extrair_discoveries, [("discovery.xlsx", BytesIO(job["discovery_xlsx"]))]
+            )
+        if not discovery and not job["transcricao"]:
+            raise ValueError("É necessário fornecer discovery e/ou transcrição.")
+        return await self.gerar(discovery, job["transcricao"], job["observacoes"], job["cliente"], job["idioma"])
+
+    async def _worker(self):
+        # Todo acesso ao SQLite sai do event loop (busy_timeout pode segurar até 5 s)
+        while True:
+            try:
+                job = await asyncio.to_thread(self.armazem.reservar_proximo)
+            except sqlite3.Error:
+                logger.exception("Falha ao reservar job; nova tentativa em %gs", ESPERA_ERRO_SQLITE)
+                await asyncio.sleep(ESPERA_ERRO_SQLITE)
+                continue
+            if job is None:
+                self._novo_job.clear()
+                try:
+                    await asyncio.wait_for(self._novo_job.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._limite.aguardar()
+            try:
+                # Mesmo registro de tempos/tokens de uma requisição HTTP (vai para o histórico)
+                with requisicao(job["id"]):
+                    resultado = await asyncio.wait_for(self._executar(job), self.armazem.prazo or None)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                logger.warning("Job %s cancelado: prazo de %gs esgotado", job["id"], self.armazem.prazo)
+                await self._finalizar(job["id"], erro=f"Prazo de {self.armazem.prazo:g}s esgotado.")
+            except Exception as e:
+                logger.exception("Job %s falhou", job["id"])
+                await self._finalizar(job["id"], erro=str(e))
+            else:
+                await self._finalizar(job["id"], resultado=resultado)
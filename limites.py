@@ -0,0 +1,98 @@
+import os
+import random
+import threading
+import time
+
+# Controle de vazão para a OpenAI: baldes de tokens para requisições/minuto e
+# tokens/minuto, e backoff exponencial com jitter para 429 e 5xx.
+#
+# Os baldes são por processo: OPENAI_RPM/OPENAI_TPM são a cota do serviço
+# inteiro e cada processo fica com 1/OPENAI_PROCESSOS dela (padrão:
+# WEB_CONCURRENCY, o número de workers do uvicorn). Serviços separados que
+# usam a mesma chave (API e Streamlit) precisam de cotas que somem no máximo
+# o limite da conta.
+
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "150000"))
+OPENAI_PROCESSOS = max(1, int(os.getenv("OPENAI_PROCESSOS", os.getenv("WEB_CONCURRENCY", "1"))))
+MAX_TENTATIVAS = int(os.getenv("OPENAI_MAX_TENTATIVAS", "6"))
+BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "60"))
+
+
+class BaldeTokens:
+    # Balde que reabastece `por_minuto` unidades por minuto, com capacidade de
+    # um minuto. reservar() debita na hora e devolve quanto esperar, então
+    # chamadas concorrentes formam fila sem precisar de lock assíncrono.
+    def __init__(self, por_minuto, relogio=time.monotonic):
+        self.capacidade = float(por_minuto)
+        self.taxa = por_minuto / 60.0
+        self._relogio = relogio
+        self._saldo = self.capacidade
+        self._atualizado = relogio()
+        self._lock = threading.Lock()
+
+    def _reabastecer(self):
+        agora = self._relogio()
+        self._saldo = min(self.capacidade, self._saldo + (agora - self._atualizado) * self.taxa)
+        self._atualizado = agora
+
+    def reservar(self, custo):
+        if self.taxa <= 0:
+            return 0.0
+        custo = min(custo, self.capacidade)
+        with self._lock:
+            self._reabastecer()
+            self._saldo -= custo
+            return max(0.0, -self._saldo / self.taxa)
+
+    def devolver(self, quantidade):
+        # Corrige uma reserva estimada com o consumo real (pode ser negativo)
+        if self.taxa <= 0:
+            return
+        with self._lock:
+            self._reabastecer()
+            self._saldo = min(self.capacidade, self._saldo + quantidade)
+
+
+class LimitadorOpenAI:
+    def __init__(self, rpm=OPENAI_RPM / OPENAI_PROCESSOS, tpm=OPENAI_TPM / OPENAI_PROCESSOS, relogio=time.monotonic):
+        self.requisicoes = BaldeTokens(rpm, relogio)
+        self.tokens = BaldeTokens(tpm, relogio)
+
+    def reservar(self, tokens_estimados):
+        return max(self.requisicoes.reservar(1), self.tokens.reservar(tokens_estimados))
+
+    def ajustar(self, tokens_estimados, tokens_reais):
+        self.tokens.devolver(tokens_estimados - tokens_reais)
+
+
+def eh_retentavel(erro):
+    from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+
+    if isinstance(erro, (RateLimitError, APIConnectionError, APITimeoutError)):
+        return True
+    return isinstance(erro, APIStatusError) and erro.status_code >= 500
+
+
+def espera_backoff(tentativa, erro=None):
+    # Respeita Retry-After quando o servidor informa; senão exponencial com jitter
+    resposta = getattr(erro, "response", None)
+    if resposta is not None:
+        retry_after = resposta.headers.get("retry-after")
+        try:
+            return min(BACKOFF_MAX, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+    teto = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** tentativa)
+    return random.uniform(teto / 2, teto)
+
+
+_limitador = None
+
+
+def obter_limitador():
+    global _limitador
+    if _limitador is None:
+        _limitador = LimitadorOpenAI()
+    return _limitador
@@ -0,0 +1,219 @@
+import asyncio
+import os
+import time
+
+from cache import chave_cache, obter_cache
+from limites import MAX_TENTATIVAS, eh_retentavel, espera_backoff, obter_limitador
+from metricas import RETENTATIVAS, medir, observar, registrar_cache, registrar_uso
+from tokens import contar_tokens
+
+# Parâmetros do modelo usados em todas as gerações (também entram na chave do cache)
+MODELO = "gpt-4-1106-preview"
+TEMPERATURA = 0.3
+MAX_TOKENS = 3000
+
+# ⚡ Um cliente síncrono e um AsyncOpenAI por processo, com pool de conexões
+# HTTP keep-alive, e um semáforo limitando quantas gerações ficam em voo.
+# OPENAI_BASE_URL permite apontar para um servidor local compatível.
+MAX_GERACOES_CONCORRENTES = int(os.getenv("MAX_GERACOES_CONCORRENTES", "32"))
+OPENAI_MAX_CONEXOES = int(os.getenv("OPENAI_MAX_CONEXOES", "100"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+_limite_geracoes = asyncio.Semaphore(MAX_GERACOES_CONCORRENTES)
+_cliente = None
+_cliente_async = None
+
+
+def _opcoes_cliente():
+    import httpx
+
+    return {
+        "api_key": os.getenv("OPENAI_API_KEY"),
+        "base_url": os.getenv("OPENAI_BASE_URL") or None,
+        "max_retries": 0,  # retentativas ficam com chamar_com_retentativa
+        "timeout": OPENAI_TIMEOUT,
+    }, httpx.Limits(max_connections=OPENAI_MAX_CONEXOES, max_keepalive_connections=OPENAI_MAX_CONEXOES)
+
+
+# openai é importado só na primeira chamada: manter o import do módulo barato
+def obter_cliente():
+    global _cliente
+    if _cliente is None:
+        import httpx
+        from openai import OpenAI
+
+        opcoes, limites = _opcoes_cliente()
+        _cliente = OpenAI(**opcoes, http_client=httpx.Client(limits=limites, timeout=OPENAI_TIMEOUT))
+    return _cliente
+
+
+def obter_cliente_async():
+    global _cliente_async
+    if _cliente_async is None:
+        import httpx
+        from openai import AsyncOpenAI
+
+        opcoes, limites = _opcoes_cliente()
+        _cliente_async = AsyncOpenAI(**opcoes, http_client=httpx.AsyncClient(limits=limites, timeout=OPENAI_TIMEOUT))
+    return _cliente_async
+
+
+def _tokens_estimados(prompt, max_tokens):
+    return contar_tokens(prompt) + max_tokens
+
+
+def chamar_com_retentativa(criar, prompt, max_tokens):
+    # Espera a vez nos baldes de RPM/TPM e retenta 429/5xx com backoff
+    limitador = obter_limitador()
+    estimados = _tokens_estimados(prompt, max_tokens)
+    for tentativa in range(MAX_TENTATIVAS):
+        time.sleep(limitador.reservar(estimados))
+        try:
+            return criar()
+        except Exception as e:
+            if tentativa == MAX_TENTATIVAS - 1 or not eh_retentavel(e):
+                raise
+            RETENTATIVAS.inc()
+            time.sleep(espera_backoff(tentativa, e))
+
+
+async def chamar_com_retentativa_async(criar, prompt, max_tokens):
+    limitador = obter_limitador()
+    estimados = _tokens_estimados(prompt, max_tokens)
+    for tentativa in range(MAX_TENTATIVAS):
+        await asyncio.sleep(limitador.reservar(estimados))
+        try:
+            return await criar()
+        except Exception as e:
+            if tentativa == MAX_TENTATIVAS - 1 or not eh_retentavel(e):
+                raise
+            RETENTATIVAS.inc()
+            await asyncio.sleep(espera_backoff(tentativa, e))
+
+
+def _ajustar_limite(prompt, max_tokens, usage):
+    if usage is not None:
+        reais = (usage.prompt_tokens or 0) + (usage.completion_tokens or 0)
+        obter_limitador().ajustar(_tokens_estimados(prompt, max_tokens), reais)
+
+
+def _consultar_cache(chave):
+    resultado = obter_cache().obter(chave)
+    registrar_cache(resultado is not None)
+    return resultado
+
+
+def _formato(formato_json):
+    # JSON mode da OpenAI: a resposta vem sempre como um objeto JSON válido
+    return "json_object" if formato_json else None
+
+
+def _extras(formato):
+    return {"response_format": {"type": formato}} if formato else {}
+
+
+def completar(prompt, max_tokens=MAX_TOKENS, formato_json=False, usar_cache=True, versao=None):
+    # usar_cache=False força uma nova geração (que substitui a do cache)
+    formato = _formato(formato_json)
+    chave = chave_cache(prompt, MODELO, TEMPERATURA, max_tokens, formato, versao)
+    resultado = _consultar_cache(chave) if usar_cache else None
+    if resultado is not None:
+        return resultado
+    client = obter_cliente()
+    with medir("chamada_openai"):
+        r = chamar_com_retentativa(lambda: client.chat.completions.create(
+            model=MODELO,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=TEMPERATURA,
+            max_tokens=max_tokens,
+            **_extras(formato),
+        ), prompt, max_tokens)
+    resultado = r.choices[0].message.content
+    registrar_uso(r.usage, prompt, resultado)
+    _ajustar_limite(prompt, max_tokens, r.usage)
+    obter_cache().guardar(chave, resultado)
+    return resultado
+
+
+async def completar_async(prompt, max_tokens=MAX_TOKENS, formato_json=False, usar_cache=True, versao=None):
+    formato = _formato(formato_json)
+    chave = chave_cache(prompt, MODELO, TEMPERATURA, max_tokens, formato, versao)
+    resultado = await asyncio.to_thread(_consultar_cache, chave) if usar_cache else None
+    if resultado is not None:
+        return resultado
+    async with _limite_geracoes:
+        with medir("chamada_openai"):
+            r = await chamar_com_retentativa_async(lambda: obter_cliente_async().chat.completions.create(
+                model=MODELO,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=TEMPERATURA,
+                max_tokens=max_tokens,
+                **_extras(formato),
+            ), prompt, max_tokens)
+    resultado = r.choices[0].message.content
+    registrar_uso(r.usage, prompt, resultado)
+    _ajustar_limite(prompt, max_tokens, r.usage)
+    await asyncio.to_thread(obter_cache().guardar, chave, resultado)
+    return resultado
+
+
+def completar_stream(prompt, max_tokens=MAX_TOKENS, versao=None):
+    # Gera o texto em trechos à medida que o modelo produz; só vai ao cache se completar
+    chave = chave_cache(prompt, MODELO, TEMPERATURA, max_tokens, versao=versao)
+    resultado = _consultar_cache(chave)
+    if resultado is not None:
+        yield resultado
+        return
+    client = obter_cliente()
+    inicio = time.perf_counter()
+    stream = chamar_com_retentativa(lambda: client.chat.completions.create(
+        model=MODELO,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=TEMPERATURA,
+        max_tokens=max_tokens,
+        stream=True,
+        stream_options={"include_usage": True},
+    ), prompt, max_tokens)
+    partes, usage = [], None
+    for evento in stream:
+        usage = evento.usage or usage
+        if evento.choices and evento.choices[0].delta.content:
+            if not partes:
+                observar("primeiro_token", time.perf_counter() - inicio)
+            partes.append(evento.choices[0].delta.content)
+            yield partes[-1]
+    observar("chamada_openai", time.perf_counter() - inicio)
+    resultado = "".join(partes)
+    registrar_uso(usage, prompt, resultado)
+    _ajustar_limite(prompt, max_tokens, usage)
+    obter_cache().guardar(chave, resultado)
+
+
+async def completar_stream_async(prompt, max_tokens=MAX_TOKENS, versao=None):
+    chave = chave_cache(prompt, MODELO, TEMPERATURA, max_tokens, versao=versao)
+    resultado = await asyncio.to_thread(_consultar_cache, chave)
+    if resultado is not None:
+        yield resultado
+        return
+    partes, usage = [], None
+    async with _limite_geracoes:
+        inicio = time.perf_counter()
+        stream = await chamar_com_retentativa_async(lambda: obter_cliente_async().chat.completions.create(
+            model=MODELO,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=TEMPERATURA,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+        ), prompt, max_tokens)
+        async for evento in stream:
+            usage = evento.usage or usage
+            if evento.choices and evento.choices[0].delta.content:
+                if not partes:
+                    observar("primeiro_token", time.perf_counter() - inicio)
+                partes.append(evento.choices[0].delta.content)
+                yield partes[-1]
+        observar("chamada_openai", time.perf_counter() - inicio)
+    resultado = "".join(partes)
+    registrar_uso(usage, prompt, resultado)
+    _ajustar_limite(prompt, max_tokens, usage)
+    await asyncio.to_thread(obter_cache().guardar, chave, resultado)
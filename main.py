@@ -1 +1 @@
-from app import app
+from api import app
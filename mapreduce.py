@@ -0,0 +1,93 @@
+import asyncio
+import os
+
+from llm import completar, completar_async
+from tokens import contar_tokens, dividir_em_chunks
+
+# Map-reduce para fontes muito longas: quando discovery + transcrição passam do
+# orçamento, cada fonte é quebrada em chunks, os insights parciais de cada
+# chunk são extraídos em paralelo e o relatório final é montado sobre eles.
+LIMITE_TOKENS_FONTES = int(os.getenv("LIMITE_TOKENS_FONTES", "60000"))
+TOKENS_POR_CHUNK = int(os.getenv("TOKENS_POR_CHUNK", "6000"))
+MAX_TOKENS_PARCIAL = int(os.getenv("MAX_TOKENS_PARCIAL", "1200"))
+CHUNKS_CONCORRENTES = int(os.getenv("CHUNKS_CONCORRENTES", "8"))
+MAX_RODADAS = 3
+
+NOMES_FONTES = {
+    "portuguese": {"discovery": "discovery técnico", "transcricao": "transcrição da call"},
+    "spanish": {"discovery": "discovery técnico", "transcricao": "transcripción de la llamada"},
+    "english": {"discovery": "technical discovery", "transcricao": "call transcript"},
+}
+
+PROMPTS_PARCIAIS = {
+    "portuguese": '''🛑 Responda apenas em **português**.
+
+Trecho {indice}/{total} do {fonte}:
+"""{trecho}"""
+
+Extraia deste trecho, em bullets objetivos, todos os fatos úteis para um relatório de projeto: contexto e modelo de operação, dados quantitativos, objetivos, riscos, casos de uso, integrações e sistemas, dúvidas, restrições, premissas, próximos passos, regras comerciais e operacionais.
+🚫 Não resuma de forma genérica; preserve números, nomes de sistemas e regras exatamente como aparecem. Não invente nada.''',
+    "spanish": '''🛑 Responde solo en **español**.
+
+Fragmento {indice}/{total} de la {fonte}:
+"""{trecho}"""
+
+Extrae de este fragmento, en bullets objetivos, todos los hechos útiles para un informe de proyecto: contexto y modelo operativo, datos cuantitativos, objetivos, riesgos, casos de uso, integraciones y sistemas, dudas, restricciones, supuestos, próximos pasos, reglas comerciales y operativas.
+🚫 No resumas de forma genérica; conserva números, nombres de sistemas y reglas tal como aparecen. No inventes nada.''',
+    "english": '''🛑 Respond only in **English**.
+
+Excerpt {indice}/{total} of the {fonte}:
+"""{trecho}"""
+
+Extract from this excerpt, as objective bullets, every fact useful for a project report: context and operating model, quantitative data, objectives, risks, use cases, integrations and systems, open questions, constraints, assumptions, next steps, commercial and operational rules.
+🚫 Do not summarize generically; keep numbers, system names and rules exactly as they appear. Do not invent anything.''',
+}
+
+
+def _tamanhos(discovery, transcricao, observacoes):
+    # ({fonte: tokens}, total): tokenizar centenas de milhares de caracteres leva
+    # segundos, por isso roda numa thread e não no event loop
+    tamanhos = {"discovery": contar_tokens(discovery), "transcricao": contar_tokens(transcricao)}
+    return tamanhos, sum(tamanhos.values()) + contar_tokens(observacoes)
+
+
+async def _extrair_parciais(texto, fonte, idioma, separador, completar_fn):
+    chunks = await asyncio.to_thread(dividir_em_chunks, texto, TOKENS_POR_CHUNK, separador)
+    limite = asyncio.Semaphore(CHUNKS_CONCORRENTES)
+    nome_fonte = NOMES_FONTES[idioma][fonte]
+
+    async def extrair(indice, trecho):
+        prompt = PROMPTS_PARCIAIS[idioma].format(indice=indice, total=len(chunks), fonte=nome_fonte, trecho=trecho)
+        async with limite:
+            return await completar_fn(prompt, MAX_TOKENS_PARCIAL)
+
+    parciais = await asyncio.gather(*(extrair(i, c) for i, c in enumerate(chunks, 1)))
+    return "\n\n".join(parciais)
+
+
+async def condensar_fontes_async(discovery, transcricao, observacoes, idioma, completar_fn=completar_async):
+    # Devolve (discovery, transcricao) cabendo no orçamento; fontes pequenas passam intactas
+    separadores = {"discovery": "\n\n", "transcricao": "\n"}
+    for _ in range(MAX_RODADAS):
+        tamanhos, total = await asyncio.to_thread(_tamanhos, discovery, transcricao, observacoes)
+        if total <= LIMITE_TOKENS_FONTES:
+            break
+        grandes = [fonte for fonte, tamanho in tamanhos.items() if tamanho > TOKENS_POR_CHUNK]
+        if not grandes:
+            break
+        textos = {"discovery": discovery, "transcricao": transcricao}
+        condensados = await asyncio.gather(
+            *(_extrair_parciais(textos[f], f, idioma, separadores[f], completar_fn) for f in grandes)
+        )
+        textos.update(zip(grandes, condensados))
+        discovery, transcricao = textos["discovery"], textos["transcricao"]
+        separadores = {"discovery": "\n\n", "transcricao": "\n\n"}
+    return discovery, transcricao
+
+
+def condensar_fontes(discovery, transcricao, observacoes, idioma):
+    # Versão síncrona (Streamlit): chunks em paralelo em threads com o cliente síncrono
+    async def via_thread(prompt, max_tokens):
+        return await asyncio.to_thread(completar, prompt, max_tokens)
+
+    return asyncio.run(condensar_fontes_async(discovery, transcricao, observacoes, idioma, via_thread))
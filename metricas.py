@@ -0,0 +1,174 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+# Instrumentação por etapa: cada `medir("etapa")` alimenta o histograma
+# Prometheus e o registro de tempos da requisição corrente, que é logado
+# como uma linha JSON com o id da requisição ao final.
+#
+# Com uvicorn --workers N cada processo tem os próprios contadores: com
+# PROMETHEUS_MULTIPROC_DIR definido (diretório vazio a cada start), o
+# prometheus_client grava os valores em arquivos e o /metrics de qualquer
+# worker devolve a soma de todos.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+logger = logging.getLogger("insights.timing")
+if not logger.handlers:
+    # Uma linha JSON por requisição em stderr, independente da config do uvicorn
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+BUCKETS_BYTES = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+
+ETAPA_SEGUNDOS = Histogram(
+    "insights_etapa_segundos", "Duração de cada etapa da geração", ["etapa"], buckets=BUCKETS_SEGUNDOS
+)
+REQUISICAO_SEGUNDOS = Histogram(
+    "insights_requisicao_segundos", "Duração total das requisições HTTP", ["rota", "status"], buckets=BUCKETS_SEGUNDOS
+)
+TOKENS = Counter("insights_tokens", "Tokens consumidos na OpenAI", ["tipo"])
+PROMPT_BYTES = Histogram("insights_prompt_bytes", "Tamanho do prompt enviado", buckets=BUCKETS_BYTES)
+RESPOSTA_BYTES = Histogram("insights_resposta_bytes", "Tamanho do texto gerado", buckets=BUCKETS_BYTES)
+TOKENS_ECONOMIZADOS = Counter("insights_tokens_economizados", "Tokens removidos das fontes pela compactação")
+RETENTATIVAS = Counter("insights_openai_retentativas", "Chamadas à OpenAI repetidas após 429/5xx")
+CACHE = Counter("insights_cache_consultas", "Consultas ao cache de relatórios", ["resultado"])
+EM_VOO = Gauge(
+    "insights_requisicoes_em_voo", "Requisições HTTP em andamento (soma dos workers vivos)", multiprocess_mode="livesum"
+)
+REJEITADAS = Counter("insights_requisicoes_rejeitadas", "Requisições recusadas (lotado) ou canceladas (prazo)", ["motivo"])
+
+_id_requisicao = contextvars.ContextVar("id_requisicao", default=None)
+_tempos = contextvars.ContextVar("tempos", default=None)
+
+
+@contextmanager
+def requisicao(id_requisicao):
+    # Abre o registro de tempos da requisição e devolve o dict de etapas
+    tempos = {}
+    token_id = _id_requisicao.set(id_requisicao)
+    token_tempos = _tempos.set(tempos)
+    try:
+        yield tempos
+    finally:
+        _id_requisicao.reset(token_id)
+        _tempos.reset(token_tempos)
+
+
+def observar(etapa, duracao):
+    ETAPA_SEGUNDOS.labels(etapa).observe(duracao)
+    tempos = _tempos.get()
+    if tempos is not None:
+        tempos[etapa] = round(tempos.get(etapa, 0.0) + duracao, 4)
+
+
+@contextmanager
+def medir(etapa):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(etapa, time.perf_counter() - inicio)
+
+
+def registrar_uso(usage, prompt, resposta):
+    PROMPT_BYTES.observe(len(prompt.encode("utf-8")))
+    RESPOSTA_BYTES.observe(len(resposta.encode("utf-8")))
+    if usage is not None:
+        TOKENS.labels("prompt").inc(usage.prompt_tokens or 0)
+        TOKENS.labels("completion").inc(usage.completion_tokens or 0)
+        tempos = _tempos.get()
+        if tempos is not None:
+            tempos["tokens_prompt"] = tempos.get("tokens_prompt", 0) + (usage.prompt_tokens or 0)
+            tempos["tokens_completion"] = tempos.get("tokens_completion", 0) + (usage.completion_tokens or 0)
+
+
+def registrar_compactacao(relatorio):
+    TOKENS_ECONOMIZADOS.inc(max(0, relatorio["tokens_economizados"]))
+    tempos = _tempos.get()
+    if tempos is not None:
+        tempos["tokens_economizados"] = tempos.get("tokens_economizados", 0) + relatorio["tokens_economizados"]
+
+
+def tempos_atuais():
+    # Cópia das etapas e tokens acumulados até aqui na requisição corrente
+    return dict(_tempos.get() or {})
+
+
+def registrar_cache(acerto):
+    CACHE.labels("acerto" if acerto else "falha").inc()
+
+
+def logar_requisicao(rota, status, duracao, tempos):
+    REQUISICAO_SEGUNDOS.labels(rota, str(status)).observe(duracao)
+    logger.info(json.dumps({
+        "id_requisicao": _id_requisicao.get(),
+        "rota": rota,
+        "status": status,
+        "total_s": round(duracao, 4),
+        "etapas": tempos,
+    }, ensure_ascii=False))
+
+
+class Instrumentacao:
+    # Middleware ASGI puro: id da requisição (recebido em X-Request-ID ou gerado)
+    # + log JSON com os tempos por etapa, escrito depois do último byte da
+    # resposta, então streams SSE registram a chamada à OpenAI e os tokens
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        cabecalhos = dict(scope["headers"])
+        id_requisicao = cabecalhos.get(b"x-request-id", b"").decode("latin-1") or uuid.uuid4().hex
+        inicio = time.perf_counter()
+        status = None
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                mensagem = {
+                    **mensagem,
+                    "headers": [*mensagem.get("headers", []), (b"x-request-id", id_requisicao.encode("latin-1"))],
+                }
+            await send(mensagem)
+
+        with requisicao(id_requisicao) as tempos:
+            try:
+                await self.app(scope, receive, enviar)
+            except asyncio.CancelledError:
+                status = status or 504  # prazo da requisição esgotado (sobrecarga.py)
+                raise
+            finally:
+                rota = scope.get("route")
+                logar_requisicao(
+                    rota.path if rota else "desconhecida", status or 500, time.perf_counter() - inicio, tempos
+                )
+
+
+def exportar():
+    if not PROMETHEUS_MULTIPROC_DIR:
+        return generate_latest(), CONTENT_TYPE_LATEST
+    from prometheus_client import multiprocess
+
+    registro = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registro)
+    return generate_latest(registro), CONTENT_TYPE_LATEST
+
+
+def encerrar_processo():
+    # Tira o processo que está saindo dos gauges "live*" do modo multiprocesso
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,253 @@
+import re
+from string import Formatter
+
+# Registro único dos prompts do relatório, usado pela API, pela interface e
+# pela geração por seção. Cada idioma tem uma só definição; na importação ela
+# é quebrada em trechos fixos + campos e dividida por seção, então montar um
+# prompt é um único "".join, sem formatar o texto de novo a cada requisição.
+# Mudou algum texto daqui, incremente VERSAO_PROMPTS: ela entra na chave do cache.
+VERSAO_PROMPTS = "2"
+
+SECOES = [
+    "contexto", "objetivos", "riscos", "casos_de_uso", "integracoes", "duvidas",
+    "restricoes", "premissas", "proximos_passos", "observacoes", "dados_operacionais",
+]
+
+RELATORIOS = {
+    "portuguese": '''🛑 IMPORTANTE: Responda apenas em **português**. Não use outros idiomas.
+
+Projeto com o cliente: **{cliente}**
+
+Abaixo estão os conteúdos de três fontes:
+
+📂 Insights do discovery técnico:
+"""{discovery}"""
+
+💬 Insights da transcrição da call:
+"""{transcricao}"""
+
+📌 Observações diretas do Solutions Consultant:
+"""{observacoes}"""
+
+Agora, una essas informações em um único relatório estruturado, evitando duplicações e organizando os tópicos com o máximo de clareza e objetividade.
+
+1. 📌 **Contexto do projeto**  
+   - Descreva de forma completa e detalhada o modelo de operação atual da empresa.  
+   - Inclua informações como: modelo de negócios, número de centros de distribuição, número de vendedores, ticket médio, volume médio de pedidos, processos operacionais atuais, canais de venda (WhatsApp, loja online, televendas), formas de pagamento (boleto antecipado, boleto faturado, PIX, cartão), clusters de clientes, tabelas de preços, regras de promoções (combos, leve X pague Y, descontos progressivos, cupons), condições comerciais, controle de estoque (estoque por CD, disponibilidade restrita), regras de corte (dias/horários), sistemas envolvidos (Mercanet, Infracommerce, SAP, Salesforce, gateways de pagamento, APIs internas) e qualquer outro dado relevante.  
+   - 🚫 **Não resuma de forma genérica**; mantenha todos os detalhes disponíveis.  
+   - 📌 Dados quantitativos (nº de pedidos, clientes, SKUs, volumes, ticket médio) devem estar aqui.
+
+2. 🌟 **Objetivos principais do projeto**  
+   - Use bullets com verbos de ação fortes (Digitalizar, Automatizar, Viabilizar, Expandir, Aumentar, Implementar, Reduzir, Integrar).  
+   - Relacione cada objetivo a resultados práticos (eficiência, engajamento, automação, expansão).  
+   - Sempre que possível, conecte os objetivos às fases do projeto (fase 1 = autosserviço, fase 2 = commerce).  
+   - Evite frases genéricas como “melhorar processos”.
+
+3. ⚠️ **Riscos e gaps identificados** (em bullets)
+
+4. 📦 **Casos de uso propostos ou discutidos** (em bullets)
+
+5. 🔗 **Integrações mencionadas ou necessárias** (em bullets)  
+   - Descreva todos os sistemas (Mercanet, Infracommerce, gateways, ERPs, APIs internas).  
+   - Detalhe quais dados devem ser sincronizados ou expostos (catálogo, preços, estoque, status de pedidos, cadastro de clientes, dados de representantes).  
+   - Informe métodos de integração (API/REST, CSV, Webhook).  
+   - Se houver requisitos de teste, homologação, segurança ou autenticação, inclua-os.  
+   - 🚫 **Não resuma**; preserve todos os detalhes das fontes.
+
+6. ❓ **Dúvidas ou pontos pendentes levantados na call** (em bullets)
+
+7. 🔒 **Restrições técnicas ou comerciais citadas** (em bullets)
+
+8. 🧩 **Premissas acordadas entre as partes** (em bullets)
+
+9. 🔄 **Próximos passos mencionados ou sugeridos** (em bullets)
+
+10. 📝 **Observações gerais ou insights adicionais relevantes**
+
+11. 📊 **Dados operacionais e regras comerciais identificadas**  
+    - Consolide catálogo de produtos, SKUs, tipos de clientes, clusters, tabelas de preços, condições comerciais, regras de promoções, formas de pagamento, métodos de corte, controle de estoque, volumes e ticket médio.  
+    - Descreva regras de checkout: limitações de pagamento, pré-requisitos de compra, políticas de crédito, exigências de faturamento ou pagamento antecipado.  
+    - ✅ **Formato de “painel operacional”** (bullets ou tabela).  
+    - 🔥 Transcreva fielmente; se faltar algo, exiba “Informação não fornecida nas fontes.”''',
+    "spanish": '''🛑 IMPORTANTE: Responde solo en **español**. No utilices otros idiomas.
+
+Proyecto con el cliente: **{cliente}**
+
+A continuación se presentan los contenidos de tres fuentes:
+
+📂 Insights del discovery técnico:
+"""{discovery}"""
+
+💬 Insights de la transcripción de la llamada:
+"""{transcricao}"""
+
+📌 Observaciones directas del Solutions Consultant:
+"""{observacoes}"""
+
+Ahora, une esta información en un informe estructurado, evitando duplicaciones y organizando los temas con la mayor claridad posible.
+
+1. 📌 **Contexto del proyecto**  
+   - Describe en detalle el modelo operativo actual de la empresa.  
+   - Incluye: modelo de negocio, número de centros de distribución, número de vendedores, ticket promedio, volumen de pedidos, procesos vigentes, canales de venta (WhatsApp, tienda online, televentas), formas de pago (boleto anticipado, boleto facturado, PIX, tarjeta), grupos de clientes, tablas de precios, reglas de promociones (combos, lleva X paga Y, descuentos progresivos, cupones), condiciones comerciales, control de inventario (por CD, disponibilidad restringida), reglas de corte (días/horarios), sistemas involucrados (Mercanet, Infracommerce, SAP, Salesforce, pasarelas, APIs internas) y cualquier otro dato relevante.  
+   - 🚫 **No resumas de forma genérica**; conserva todos los detalles.  
+   - 📌 Si hay datos cuantitativos (n.º de pedidos, clientes, SKUs, volúmenes, ticket promedio), inclúyelos.
+
+2. 🌟 **Objetivos principales del proyecto**  
+   - Usa bullets con verbos de acción (Digitalizar, Automatizar, Viabilizar, Expandir, Aumentar, Implementar, Reducir, Integrar).  
+   - Relaciona cada objetivo con resultados prácticos (eficiencia, engagement, automatización, expansión).  
+   - Conecta con fases del proyecto (fase 1 = autoservicio, fase 2 = commerce).  
+   - Evita frases genéricas como “mejorar procesos”.
+
+3. ⚠️ **Riesgos y brechas identificadas** (en bullets)
+
+4. 📦 **Casos de uso propuestos o discutidos** (en bullets)
+
+5. 🔗 **Integraciones mencionadas o necesarias** (en bullets)  
+   - Describe todos los sistemas, datos, métodos, requisitos de prueba/homologación/seguridad.  
+   - 🚫 **No resumas**; conserva todos los detalles.
+
+6. ❓ **Dudas o puntos pendientes planteados en la llamada** (en bullets)
+
+7. 🔒 **Restricciones técnicas o comerciales mencionadas** (en bullets)
+
+8. 🧩 **Supuestos acordados entre las partes** (en bullets)
+
+9. 🔄 **Próximos pasos mencionados o sugeridos** (en bullets)
+
+10. 📝 **Observaciones generales o insights adicionales**  
+
+11. 📊 **Datos operativos y reglas comerciales identificadas**  
+    - Consolida catálogo, SKUs, clusters, tablas de precios, condiciones comerciales, reglas de promociones, formas de pago, métodos de corte, control de inventario, volúmenes, ticket medio.  
+    - Describe reglas de checkout: limitaciones de pago, prerrequisitos, políticas de crédito, requisitos de facturación o anticipación.  
+    - ✅ **Panel operativo** (bullets ou tabla).  
+    - 🔥 Transcribe fielmente; si falta algo, “Información no proporcionada en las fuentes.”''',
+    "english": '''🛑 IMPORTANT: Respond only in **English**. Do not use any other language.
+
+Project with client: **{cliente}**
+
+Below are the contents from three sources:
+
+📂 Insights from the technical discovery:
+"""{discovery}"""
+
+💬 Insights from the call transcript:
+"""{transcricao}"""
+
+📌 Consultant’s direct notes:
+"""{observacoes}"""
+
+Now, merge this information into a single structured report, avoiding duplication and organizing the topics clearly and concisely.
+
+1. 📌 **Project context**  
+   - Describe in full detail the company’s current operating model: business model, number of distribution centers, number of sales reps, average ticket, order volume, current processes, sales channels (WhatsApp, online store, telesales), payment methods (boleto antecipado, boleto faturado, PIX, credit card), customer clusters, price tables, promotion rules (combos, buy X pay Y, tiered discounts, coupons), commercial conditions, inventory control (by DC, restricted availability), cut-off rules (days/hours), systems involved (Mercanet, Infracommerce, SAP, Salesforce, payment gateways, internal APIs) and any other relevant data.  
+   - 🚫 **Do not summarize generically**; preserve all details.  
+   - 📌 If quantitative data exists (order count, customers, SKUs, volumes, average ticket), include it.
+
+2. 🌟 **Main objectives of the project**  
+   - Use bullets with strong action verbs (Digitize, Automate, Enable, Expand, Increase, Implement, Reduce, Integrate).  
+   - Link each objective to practical outcomes (efficiency, engagement, automation, expansion).  
+   - When possible, tie objectives to project phases (phase 1 = self-service, phase 2 = commerce).  
+   - Avoid generic phrases like “improve processes.”
+
+3. ⚠️ **Identified risks and gaps** (in bullets)
+
+4. 📦 **Proposed or discussed use cases** (in bullets)
+
+5. 🔗 **Mentioned or required integrations** (in bullets)  
+   - Describe all systems, data, methods, security requirements.  
+   - 🚫 **Do not summarize.**
+
+6. ❓ **Open questions or pending issues raised in the call** (in bullets)
+
+7. 🔒 **Technical or commercial constraints mentioned** (in bullets)
+
+8. 🧩 **Agreed assumptions between the parties** (in bullets)
+
+9. 🔄 **Suggested or mentioned next steps** (in bullets)
+
+10. 📝 **General observations or additional insights**
+
+11. 📊 **Operational data and commercial rules identified**  
+    - Consolidate catalog, SKUs, clusters, price tables, commercial conditions, promotion rules, payment methods, DC cut-off rules, inventory controls, volumes, ticket.  
+    - Describe checkout rules: payment limitations, purchase prerequisites, credit policies, billing or advance payment requirements.  
+    - ✅ **This must be an “operational panel”** (bullets or table).  
+    - 🔥 Transcribe exactly as in the sources; if missing, “Information not provided in the sources.”''',
+}
+
+# Pedido de uma seção isolada (geração por seção, saída JSON)
+PEDIDOS_SECAO = {
+    "portuguese": '''Com base nessas fontes, escreva somente a seção {titulo} do relatório do projeto, sem duplicar o que pertence às outras seções.
+{orientacao}
+Se as fontes não trazem nada sobre o tema, escreva: “Informação não fornecida nas fontes.”
+Não repita o título. Responda com um objeto JSON no formato {{"conteudo": "<markdown da seção>"}}.''',
+    "spanish": '''Con base en estas fuentes, escribe solo la sección {titulo} del informe del proyecto, sin duplicar lo que pertenece a las otras secciones.
+{orientacao}
+Si las fuentes no dicen nada sobre el tema, escribe: “Información no proporcionada en las fuentes.”
+No repitas el título. Responde con un objeto JSON en el formato {{"conteudo": "<markdown de la sección>"}}.''',
+    "english": '''Based on these sources, write only the {titulo} section of the project report, without duplicating what belongs to the other sections.
+{orientacao}
+If the sources say nothing about the topic, write: “Information not provided in the sources.”
+Do not repeat the title. Respond with a JSON object in the format {{"conteudo": "<section markdown>"}}.''',
+}
+
+
+class Template:
+    # Trechos fixos pré-separados; os campos são preenchidos por posição
+    def __init__(self, texto):
+        self._partes = []
+        self._campos = []
+        for literal, campo, _, _ in Formatter().parse(texto):
+            if literal:
+                self._partes.append(literal)
+            if campo is not None:
+                self._campos.append((len(self._partes), campo))
+                self._partes.append(None)
+
+    def montar(self, **valores):
+        partes = self._partes.copy()
+        for posicao, campo in self._campos:
+            partes[posicao] = valores[campo]
+        return "".join(partes)
+
+
+_TITULO = re.compile(r"^(.*?\*\*.+?\*\*)(.*)$", re.DOTALL)
+
+
+def _compilar(idioma, texto):
+    cabecalho, *blocos = re.split(r"\n\n(?=\d+\. )", texto)
+    titulos, pedidos = {}, {}
+    for chave, bloco in zip(SECOES, blocos, strict=True):
+        titulo, orientacao = _TITULO.match(bloco.split(". ", 1)[1]).groups()
+        titulos[chave] = titulo
+        orientacao = "\n".join(linha.strip() for linha in orientacao.strip().splitlines())
+        pedidos[chave] = PEDIDOS_SECAO[idioma].format(titulo=titulo, orientacao=orientacao)
+    return {
+        "relatorio": Template(texto),
+        # Contexto da geração por seção = cabeçalho sem a instrução final
+        "contexto": Template(cabecalho.rsplit("\n\n", 1)[0]),
+        "titulos": titulos,
+        "pedidos": pedidos,
+    }
+
+
+PROMPTS = {idioma: _compilar(idioma, texto) for idioma, texto in RELATORIOS.items()}
+
+
+def montar_relatorio(discovery, transcricao, observacoes, cliente, idioma):
+    return PROMPTS[idioma]["relatorio"].montar(
+        discovery=discovery, transcricao=transcricao, observacoes=observacoes, cliente=cliente
+    )
+
+
+def montar_contexto(discovery, transcricao, observacoes, cliente, idioma):
+    return PROMPTS[idioma]["contexto"].montar(
+        discovery=discovery, transcricao=transcricao, observacoes=observacoes, cliente=cliente
+    )
+
+
+def montar_pedido_secao(contexto, chave, idioma):
+    return "".join((contexto, "\n\n", PROMPTS[idioma]["pedidos"][chave]))
+
+
+def titulo_secao(chave, idioma):
+    return PROMPTS[idioma]["titulos"][chave]
@@ -0,0 +1,192 @@
+import difflib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+
+from banco import conectar_sqlite
+from prompts import PROMPTS, SECOES
+
+# Histórico local dos relatórios gerados (API, interface e jobs): texto,
+# conteúdo por seção, hashes das entradas, tokens e tempos, por cliente e
+# data. Busca em texto completo via FTS5 e diff seção a seção entre duas
+# execuções, sem nova chamada ao modelo. RELATORIOS_DB="" desliga.
+RELATORIOS_DB = os.getenv("RELATORIOS_DB", "relatorios.db")
+
+# Início de seção no markdown gerado: "## 1. ..." (cabeçalho markdown) ou linha
+# numerada cujo texto, sem emoji e negrito, começa com um dos títulos de
+# prompts.py ("1. 📌 **Contexto do projeto**"). Itens de lista, mesmo em negrito
+# ("1. **Modelo**: ..."), não casam.
+_LINHA_NUMERADA = re.compile(r"^[ \t]*(#{1,6}[ \t]*)?\**(\d{1,2})\.[ \t]+(.*)$", re.MULTILINE)
+_NAO_LETRAS = re.compile(r"[\W_]+")
+
+
+def _normalizar_titulo(titulo):
+    return _NAO_LETRAS.sub(" ", titulo).strip().casefold()
+
+
+_TITULOS = {_normalizar_titulo(t) for p in PROMPTS.values() for t in p["titulos"].values()}
+
+
+def _eh_titulo(cabecalho_markdown, resto):
+    if cabecalho_markdown:
+        return True
+    texto = _normalizar_titulo(resto)
+    return any(texto == titulo or texto.startswith(titulo + " ") for titulo in _TITULOS)
+
+
+def hash_texto(texto):
+    return hashlib.sha256((texto or "").encode("utf-8")).hexdigest()
+
+
+def dividir_secoes(texto):
+    # {seção: conteúdo} a partir do relatório em markdown. Só vale numeração
+    # crescente: uma lista "1. **Item**" dentro da seção 5 continua na seção 5
+    inicios, ultimo = [], 0
+    for m in _LINHA_NUMERADA.finditer(texto):
+        numero = int(m.group(2))
+        if ultimo < numero <= len(SECOES) and _eh_titulo(m.group(1), m.group(3)):
+            inicios.append((m.start(), SECOES[numero - 1]))
+            ultimo = numero
+    secoes = {}
+    for i, (inicio, chave) in enumerate(inicios):
+        fim = inicios[i + 1][0] if i + 1 < len(inicios) else len(texto)
+        # Sem a linha do título, como no modo por seção (secoes.py)
+        secoes[chave] = texto[inicio:fim].partition("\n")[2].strip()
+    return secoes
+
+
+def _consulta_fts(termos):
+    # Cada palavra vira uma frase entre aspas: nada da sintaxe do FTS5 vaza da entrada
+    return " ".join('"' + palavra.replace('"', '""') + '"' for palavra in termos.split())
+
+
+class ArmazemRelatorios:
+    def __init__(self, caminho):
+        self._db = conectar_sqlite(caminho)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS relatorios ("
+                " id TEXT PRIMARY KEY, cliente TEXT NOT NULL, idioma TEXT NOT NULL, modo TEXT NOT NULL,"
+                " texto TEXT NOT NULL, secoes TEXT NOT NULL,"
+                " hash_discovery TEXT NOT NULL, hash_transcricao TEXT NOT NULL, hash_observacoes TEXT NOT NULL,"
+                " versao_prompt TEXT, tokens_prompt INTEGER, tokens_completion INTEGER, tempos TEXT,"
+                " criado_em REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS relatorios_cliente ON relatorios (cliente, criado_em)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS relatorios_data ON relatorios (criado_em)")
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS relatorios_fts USING fts5("
+                " cliente, texto, content='relatorios', tokenize='unicode61 remove_diacritics 2')"
+            )
+            self._db.commit()
+
+    def salvar(self, cliente, idioma, texto, entradas, secoes=None, modo="completo", versao_prompt=None, tempos=None):
+        # entradas: (discovery, transcricao, observacoes) originais, guardadas só como hash
+        tempos = dict(tempos or {})
+        secoes = secoes if secoes is not None else dividir_secoes(texto)
+        id_ = uuid.uuid4().hex
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO relatorios (id, cliente, idioma, modo, texto, secoes, hash_discovery, hash_transcricao,"
+                " hash_observacoes, versao_prompt, tokens_prompt, tokens_completion, tempos, criado_em)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    id_, cliente, idioma, modo, texto, json.dumps(secoes, ensure_ascii=False),
+                    *(hash_texto(e) for e in entradas), versao_prompt,
+                    tempos.pop("tokens_prompt", None), tempos.pop("tokens_completion", None),
+                    json.dumps(tempos, ensure_ascii=False), time.time(),
+                ),
+            )
+            self._db.execute(
+                "INSERT INTO relatorios_fts (rowid, cliente, texto) VALUES (?, ?, ?)", (cursor.lastrowid, cliente, texto)
+            )
+            self._db.commit()
+        return id_
+
+    def listar(self, cliente=None, limite=50, deslocamento=0):
+        filtro, parametros = ("WHERE cliente = ?", [cliente]) if cliente else ("", [])
+        with self._lock:
+            linhas = self._db.execute(
+                "SELECT id, cliente, idioma, modo, versao_prompt, tokens_prompt, tokens_completion, criado_em"
+                f" FROM relatorios {filtro} ORDER BY criado_em DESC LIMIT ? OFFSET ?",
+                (*parametros, limite, deslocamento),
+            ).fetchall()
+        return [dict(linha) for linha in linhas]
+
+    def buscar(self, termos, cliente=None, limite=20):
+        consulta = _consulta_fts(termos)
+        if not consulta:
+            return []
+        filtro, parametros = (" AND r.cliente = ?", [cliente]) if cliente else ("", [])
+        with self._lock:
+            linhas = self._db.execute(
+                "SELECT r.id, r.cliente, r.idioma, r.criado_em,"
+                " snippet(relatorios_fts, 1, '[', ']', '…', 12) AS trecho"
+                " FROM relatorios_fts JOIN relatorios r ON r.rowid = relatorios_fts.rowid"
+                f" WHERE relatorios_fts MATCH ?{filtro} ORDER BY bm25(relatorios_fts) LIMIT ?",
+                (consulta, *parametros, limite),
+            ).fetchall()
+        return [dict(linha) for linha in linhas]
+
+    def obter(self, id_):
+        with self._lock:
+            linha = self._db.execute("SELECT * FROM relatorios WHERE id = ?", (id_,)).fetchone()
+        if linha is None:
+            return None
+        relatorio = dict(linha)
+        relatorio["secoes"] = json.loads(relatorio["secoes"])
+        relatorio["tempos"] = json.loads(relatorio["tempos"] or "{}")
+        return relatorio
+
+
+def diff_secoes(antigo, novo):
+    # Diff seção a seção entre duas execuções (unified diff só das alteradas).
+    # Sem seções reconhecidas em algum dos dois, compara o texto inteiro e avisa
+    secoes_antigas, secoes_novas = antigo["secoes"], novo["secoes"]
+    if not secoes_antigas or not secoes_novas:
+        secoes_antigas, secoes_novas = {"texto": antigo["texto"]}, {"texto": novo["texto"]}
+    resultado = []
+    for chave in [*SECOES, "texto"]:
+        antes, depois = secoes_antigas.get(chave), secoes_novas.get(chave)
+        if antes is None and depois is None:
+            continue
+        if antes == depois:
+            resultado.append({"secao": chave, "estado": "igual"})
+            continue
+        estado = "nova" if antes is None else "removida" if depois is None else "alterada"
+        linhas = difflib.unified_diff(
+            (antes or "").splitlines(), (depois or "").splitlines(), antigo["id"], novo["id"], lineterm=""
+        )
+        resultado.append({"secao": chave, "estado": estado, "diff": "\n".join(linhas)})
+    return {
+        "de": antigo["id"],
+        "para": novo["id"],
+        "entradas_iguais": {
+            fonte: antigo[f"hash_{fonte}"] == novo[f"hash_{fonte}"]
+            for fonte in ("discovery", "transcricao", "observacoes")
+        },
+        "por_secao": "texto" not in secoes_antigas,
+        "secoes": resultado,
+    }
+
+
+_armazem = None
+_armazem_lock = threading.Lock()
+
+
+def obter_armazem():
+    # None quando RELATORIOS_DB está vazio (histórico desligado)
+    global _armazem
+    if not RELATORIOS_DB:
+        return None
+    with _armazem_lock:
+        if _armazem is None:
+            _armazem = ArmazemRelatorios(RELATORIOS_DB)
+        return _armazem
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+
+from llm import completar_async
+from prompts import SECOES, VERSAO_PROMPTS, montar_pedido_secao, titulo_secao
+
+# Geração do relatório por seção: o contexto das fontes é montado uma vez e
+# cada uma das 11 seções sai de uma completion menor, em paralelo, com saída
+# JSON. O tempo total fica perto do da seção mais lenta, e uma seção pode ser
+# buscada (ou regenerada) sozinha. Sem recuperação por seção (indice.py),
+# todas compartilham o mesmo prefixo, o que aproveita o cache de prefixo da OpenAI.
+MAX_TOKENS_SECAO = int(os.getenv("MAX_TOKENS_SECAO", "800"))
+SECOES_LONGAS = {"contexto", "dados_operacionais"}  # recebem o dobro de tokens
+
+# Consultas da recuperação (indice.py) por seção, em palavras-chave nos três idiomas
+CONSULTAS = {
+    "contexto": "modelo negócio operação empresa centros distribuição CD vendedores representantes ticket médio volume pedidos clientes canais venda WhatsApp loja televendas sistemas ERP modelo negocio empresa business model company distribution sales reps orders channels",
+    "objetivos": "objetivo meta metas resultado esperado digitalizar automatizar expandir aumentar reduzir implementar fase objetivos goals objectives expected outcome phase",
+    "riscos": "risco riscos gap gaps problema dificuldade dependência bloqueio prazo atraso limitação riesgo riesgos brecha problema dependencia risk risks issue blocker delay",
+    "casos_de_uso": "caso uso casos fluxo jornada autosserviço pedido recompra catálogo atendimento bot jornada caso uso flujo autoservicio use case flow journey self-service",
+    "integracoes": "integração integrações API REST webhook CSV sistema sistemas ERP SAP Mercanet Infracommerce Salesforce gateway sincronização autenticação homologação integracion integraciones sincronizacion integration integrations sync authentication",
+    "duvidas": "dúvida dúvidas pendente pendência confirmar validar definir verificar indefinido duda dudas pendiente confirmar question questions pending confirm",
+    "restricoes": "restrição restrições limite limitação não permite obrigatório segurança LGPD contrato orçamento restricción restricciones limite seguridad constraint constraints limit security budget",
+    "premissas": "premissa premissas acordado definido responsabilidade escopo supuesto supuestos acordado alcance assumption assumptions agreed scope responsibility",
+    "proximos_passos": "próximo próximos passos cronograma prazo data reunião entrega envio ação responsável siguiente pasos reunión entrega next steps schedule deadline meeting delivery",
+    "observacoes": "observação observações comentário nota adicional geral observación comentario note comment additional general",
+    "dados_operacionais": "catálogo SKU SKUs produtos cluster clusters preço preços tabela condição comercial promoção promoções combo desconto cupom pagamento boleto PIX cartão crédito corte estoque volume ticket checkout faturamento catalogo productos precio promocion pago inventario catalog products price promotion payment inventory cutoff",
+}
+
+class ErroSecao(ValueError):
+    pass
+
+
+def validar_secoes(chaves):
+    # None/vazio = todas, na ordem do relatório
+    if not chaves:
+        return list(SECOES)
+    invalidas = [c for c in chaves if c not in SECOES]
+    if invalidas:
+        raise ErroSecao(f"Seções inválidas: {', '.join(invalidas)}. Use: {', '.join(SECOES)}.")
+    return [c for c in SECOES if c in chaves]
+
+
+def _ler_conteudo(resposta):
+    # JSON mode garante um objeto, mas o campo pode vir com outro formato
+    try:
+        dados = json.loads(resposta)
+    except (TypeError, ValueError):
+        return (resposta or "").strip()
+    conteudo = dados.get("conteudo", "") if isinstance(dados, dict) else dados
+    if isinstance(conteudo, list):
+        conteudo = "\n".join(f"- {item}" for item in conteudo)
+    return str(conteudo).strip()
+
+
+async def gerar_secoes_async(contexto, idioma, chaves=None, regenerar=False, completar_fn=completar_async):
+    # contexto: texto único para todas as seções ou dict {seção: contexto} (recuperação por seção)
+    chaves = validar_secoes(chaves)
+
+    async def gerar(chave):
+        max_tokens = MAX_TOKENS_SECAO * 2 if chave in SECOES_LONGAS else MAX_TOKENS_SECAO
+        contexto_secao = contexto[chave] if isinstance(contexto, dict) else contexto
+        resposta = await completar_fn(
+            montar_pedido_secao(contexto_secao, chave, idioma), max_tokens,
+            formato_json=True, usar_cache=not regenerar, versao=VERSAO_PROMPTS,
+        )
+        return {"secao": chave, "titulo": titulo_secao(chave, idioma), "conteudo": _ler_conteudo(resposta)}
+
+    return await asyncio.gather(*(gerar(c) for c in chaves))
+
+
+def montar_markdown(secoes):
+    # Mesma numeração do relatório completo, mesmo quando só algumas seções foram geradas
+    return "\n\n".join(
+        f"{SECOES.index(s['secao']) + 1}. {s['titulo']}\n\n{s['conteudo']}" for s in secoes
+    )
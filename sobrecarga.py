@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+
+from metricas import EM_VOO, REJEITADAS
+
+# Controle de sobrecarga da API, por processo (com uvicorn --workers N, o teto
+# total é N x MAX_REQUISICOES_EM_VOO). Acima do teto a requisição volta na hora
+# com 503 + Retry-After em vez de entrar na fila do event loop; cada requisição
+# tem um prazo e, ao estourar, a tarefa é cancelada junto com a chamada à
+# OpenAI em andamento (a conexão HTTP é fechada) e o cliente recebe 504.
+MAX_REQUISICOES_EM_VOO = int(os.getenv("MAX_REQUISICOES_EM_VOO", "32"))  # 0 = sem teto
+RETRY_AFTER_SEGUNDOS = int(os.getenv("RETRY_AFTER_SEGUNDOS", "5"))
+PRAZO_REQUISICAO = float(os.getenv("PRAZO_REQUISICAO", "120"))  # segundos; 0 = sem prazo
+
+# Fora do teto e do prazo: o health check precisa responder mesmo com o processo lotado
+ROTA_SAUDE = "/healthz"
+ROTAS_LIVRES = {ROTA_SAUDE, "/metrics"}
+
+
+async def responder_json(send, status, conteudo, cabecalhos=()):
+    corpo = json.dumps(conteudo, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(corpo)).encode()),
+            *cabecalhos,
+        ],
+    })
+    await send({"type": "http.response.body", "body": corpo})
+
+
+def prazo_da_requisicao(scope, prazo_maximo):
+    # X-Request-Timeout (segundos) só encurta o prazo do servidor, nunca alonga
+    for nome, valor in scope["headers"]:
+        if nome == b"x-request-timeout":
+            try:
+                pedido = float(valor)
+            except ValueError:
+                break
+            if pedido > 0:
+                return min(pedido, prazo_maximo) if prazo_maximo else pedido
+    return prazo_maximo or None
+
+
+class ControleCarga:
+    # Middleware ASGI puro (e não @app.middleware): conta a requisição como em voo
+    # até o último byte da resposta, inclusive nos streams SSE
+    def __init__(self, app, limite=MAX_REQUISICOES_EM_VOO, prazo=PRAZO_REQUISICAO, retry_after=RETRY_AFTER_SEGUNDOS):
+        self.app = app
+        self.limite = limite
+        self.prazo = prazo
+        self.retry_after = retry_after
+        self.em_voo = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in ROTAS_LIVRES:
+            if scope["type"] == "http" and scope["path"] == ROTA_SAUDE:
+                # Respondido aqui mesmo: não passa por rotas, SQLite, pandas nem openai
+                return await responder_json(send, 200, {"status": "ok", "em_voo": self.em_voo, "limite": self.limite})
+            return await self.app(scope, receive, send)
+
+        if self.limite and self.em_voo >= self.limite:
+            REJEITADAS.labels("lotado").inc()
+            return await responder_json(
+                send, 503, {"detail": "Servidor ocupado, tente novamente em instantes."},
+                [(b"retry-after", str(self.retry_after).encode())],
+            )
+
+        iniciada, sse, liberada = False, False, False
+
+        def liberar():
+            # Uma vez só: no último byte da resposta ou, se ele não sair, no finally
+            nonlocal liberada
+            if not liberada:
+                liberada = True
+                self.em_voo -= 1
+                EM_VOO.dec()
+
+        async def enviar(mensagem):
+            nonlocal iniciada, sse
+            if mensagem["type"] == "http.response.start":
+                iniciada = True
+                sse = dict(mensagem.get("headers", [])).get(b"content-type", b"").startswith(b"text/event-stream")
+            elif mensagem["type"] == "http.response.body" and not mensagem.get("more_body", False):
+                liberar()
+            await send(mensagem)
+
+        self.em_voo += 1
+        EM_VOO.inc()
+        try:
+            async with asyncio.timeout(prazo_da_requisicao(scope, self.prazo)) as prazo:
+                await self.app(scope, receive, enviar)
+        except TimeoutError:
+            if not prazo.expired():
+                raise
+            REJEITADAS.labels("prazo").inc()
+            detalhe = {"detail": "Prazo da requisição esgotado; a geração foi cancelada."}
+            if not iniciada:
+                await responder_json(send, 504, detalhe)
+            elif not liberada:
+                # Stream já começou: fecha com um evento de erro no lugar do "done"
+                corpo = f"event: error\ndata: {json.dumps(detalhe, ensure_ascii=False)}\n\n" if sse else ""
+                await send({"type": "http.response.body", "body": corpo.encode("utf-8"), "more_body": False})
+        finally:
+            liberar()
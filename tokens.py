@@ -0,0 +1,58 @@
+# Contagem de tokens com o tokenizer do modelo (tiktoken) quando disponível;
+# sem ele (ou sem acesso ao arquivo BPE) usa a aproximação de ~4 chars/token.
+# tiktoken é importado só na primeira contagem.
+_encoding = None
+_sem_tokenizer = False
+
+
+def _obter_encoding():
+    global _encoding, _sem_tokenizer
+    if _encoding is None and not _sem_tokenizer:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _sem_tokenizer = True
+    return _encoding
+
+
+def contar_tokens(texto):
+    if not texto:
+        return 0
+    encoding = _obter_encoding()
+    if encoding is None:
+        return len(texto) // 4 + 1
+    return len(encoding.encode(texto, disallowed_special=()))
+
+
+def cortar_em_tokens(texto, max_tokens):
+    # Quebra um texto único em pedaços de até max_tokens
+    encoding = _obter_encoding()
+    if encoding is None:
+        passo = max_tokens * 4
+        return [texto[i:i + passo] for i in range(0, len(texto), passo)]
+    ids = encoding.encode(texto, disallowed_special=())
+    return [encoding.decode(ids[i:i + max_tokens]) for i in range(0, len(ids), max_tokens)]
+
+
+def dividir_em_chunks(texto, max_tokens, separador="\n\n"):
+    # Agrupa blocos inteiros (separados por `separador`) em chunks de até max_tokens
+    chunks, atual, tamanho_atual = [], [], 0
+    custo_separador = contar_tokens(separador)
+    for bloco in texto.split(separador):
+        tamanho = contar_tokens(bloco)
+        if tamanho > max_tokens:
+            if atual:
+                chunks.append(separador.join(atual))
+                atual, tamanho_atual = [], 0
+            chunks.extend(cortar_em_tokens(bloco, max_tokens))
+            continue
+        if atual and tamanho_atual + custo_separador + tamanho > max_tokens:
+            chunks.append(separador.join(atual))
+            atual, tamanho_atual = [], 0
+        atual.append(bloco)
+        tamanho_atual += tamanho + (custo_separador if len(atual) > 1 else 0)
+    if atual:
+        chunks.append(separador.join(atual))
+    return chunks
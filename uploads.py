@@ -0,0 +1,125 @@
+import codecs
+import os
+
+from sobrecarga import responder_json
+
+# Uploads com memória constante: o arquivo do discovery segue no arquivo
+# temporário em que o Starlette já faz spool (nada de read() inteiro +
+# BytesIO), e a transcrição é decodificada em blocos, detectando a
+# codificação. Limites por arquivo respondem 413 antes de qualquer parsing.
+MAX_MB_DISCOVERY = float(os.getenv("MAX_MB_DISCOVERY", "50"))
+MAX_MB_TRANSCRICAO = float(os.getenv("MAX_MB_TRANSCRICAO", "10"))
+# Teto do corpo inteiro: pelo Content-Length antes de ler a requisição e, sem ele
+# (Transfer-Encoding: chunked), contando os bytes à medida que chegam
+MAX_MB_REQUISICAO = float(os.getenv("MAX_MB_REQUISICAO", str(MAX_MB_DISCOVERY + MAX_MB_TRANSCRICAO + 1)))
+TAMANHO_BLOCO = 2**20
+# Sem BOM e sem ser UTF-8 válido: cp1252 (superconjunto prático do Latin-1),
+# que é o que editores Windows em pt/es gravam. Detectores estatísticos erram
+# em textos curtos nesses idiomas (ã vira ă), então não são usados.
+CODIFICACAO_ALTERNATIVA = "cp1252"
+
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+
+class ArquivoGrande(ValueError):
+    def __init__(self, campo, limite_mb):
+        super().__init__(f"{campo} excede o limite de {limite_mb:g} MB.")
+
+
+def em_bytes(limite_mb):
+    return int(limite_mb * 2**20)
+
+
+def tamanho_arquivo(arquivo):
+    # UploadFile já traz o tamanho; senão mede pelo fim do arquivo
+    if getattr(arquivo, "size", None) is not None:
+        return arquivo.size
+    arquivo.file.seek(0, os.SEEK_END)
+    tamanho = arquivo.file.tell()
+    arquivo.file.seek(0)
+    return tamanho
+
+
+class _CorpoGrande(Exception):
+    pass
+
+
+class LimiteCorpo:
+    # Middleware ASGI puro: envolve o receive e corta a leitura assim que o corpo
+    # passa do limite, antes de o Starlette fazer spool do resto para o disco
+    def __init__(self, app, limite_mb=MAX_MB_REQUISICAO):
+        self.app = app
+        self.limite_mb = limite_mb
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        limite = em_bytes(self.limite_mb)
+        detalhe = {"detail": f"Requisição excede o limite de {self.limite_mb:g} MB."}
+        tamanho = dict(scope["headers"]).get(b"content-length", b"")
+        if tamanho.isdigit() and int(tamanho) > limite:
+            return await responder_json(send, 413, detalhe)
+
+        recebidos, excedeu, respondeu = 0, False, False
+
+        async def receber():
+            nonlocal recebidos, excedeu
+            mensagem = await receive()
+            if mensagem["type"] == "http.request":
+                recebidos += len(mensagem.get("body", b""))
+                if recebidos > limite:
+                    excedeu = True
+                    raise _CorpoGrande()
+            return mensagem
+
+        async def enviar(mensagem):
+            nonlocal respondeu
+            if excedeu and not respondeu:
+                # A rota pode ter transformado o erro de leitura em 400/500: vale o 413
+                return
+            respondeu = respondeu or mensagem["type"] == "http.response.start"
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receber, enviar)
+        except Exception:
+            if not excedeu or respondeu:
+                raise
+        if excedeu and not respondeu:
+            await responder_json(send, 413, detalhe)
+
+
+def verificar_tamanho(arquivo, campo, limite_mb):
+    if tamanho_arquivo(arquivo) > em_bytes(limite_mb):
+        raise ArquivoGrande(campo, limite_mb)
+
+
+async def _decodificar(arquivo, codificacao, erros):
+    decodificador = codecs.getincrementaldecoder(codificacao)(errors=erros)
+    partes = []
+    while bloco := await arquivo.read(TAMANHO_BLOCO):
+        partes.append(decodificador.decode(bloco))
+    partes.append(decodificador.decode(b"", final=True))
+    return "".join(partes)
+
+
+async def ler_transcricao(arquivo, limite_mb=MAX_MB_TRANSCRICAO):
+    # BOM decide; senão tenta UTF-8 e, se falhar, relê como cp1252
+    verificar_tamanho(arquivo, "arquivo_transcricao", limite_mb)
+    await arquivo.seek(0)
+    inicio = await arquivo.read(4)
+    await arquivo.seek(0)
+    for bom, codificacao in BOMS:
+        if inicio.startswith(bom):
+            return await _decodificar(arquivo, codificacao, "replace")
+    try:
+        return await _decodificar(arquivo, "utf-8", "strict")
+    except UnicodeDecodeError:
+        await arquivo.seek(0)
+        return await _decodificar(arquivo, CODIFICACAO_ALTERNATIVA, "replace")